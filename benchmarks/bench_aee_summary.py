@@ -0,0 +1,87 @@
+# bench_aee_summary.py
+# AEE "SO performance" summary columns: per-SO loop (previous page code) vs grouped aggregation + join.
+# Run from the repo root:  python benchmarks/bench_aee_summary.py
+
+import datetime
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jjm_engine import aee_so_summary  # noqa: E402
+
+PERIOD = 7
+READINGS_PER_SO = 20_000
+
+
+def synthetic(num_sos: int, schemes_per_so: int = 50, days: int = 30, seed: int = 42):
+    """Schemes, per-SO aggregate frame and window rows with a fixed number of rows per SO."""
+    rng = np.random.default_rng(seed)
+    today = datetime.date.today()
+    sos = np.array([f"SO {i}" for i in range(num_sos)], dtype=object)
+    n_schemes = num_sos * schemes_per_so
+    schemes = pd.DataFrame({
+        "id": np.arange(1, n_schemes + 1),
+        "so_name": np.repeat(sos, schemes_per_so),
+        "functionality": np.where(rng.random(n_schemes) < 0.75, "Functional", "Non-Functional"),
+    })
+    n = num_sos * READINGS_PER_SO
+    sid = rng.integers(1, n_schemes + 1, n)
+    dates = np.array([(today - datetime.timedelta(days=d)).isoformat() for d in range(days)], dtype=object)
+    rows = pd.DataFrame({
+        "so_name": schemes["so_name"].to_numpy()[sid - 1],
+        "jalmitra": np.array([f"JM_{i}" for i in range(n_schemes)], dtype=object)[sid - 1],
+        "scheme_id": sid,
+        "reading_date": dates[rng.integers(0, days, n)],
+    })
+    so_metrics = pd.DataFrame({"so_name": sos, "so_score": rng.random(num_sos).round(4)})
+    return so_metrics, schemes, rows, today.isoformat()
+
+
+def legacy_summary(so_metrics, schemes_df, readings_df, today_iso, period):
+    """The per-SO filtering loop the AEE page used before."""
+    so_metrics = so_metrics.copy()
+    total_schemes_map = schemes_df.groupby("so_name")["id"].nunique().to_dict()
+    func_schemes_map = schemes_df[schemes_df["functionality"] == "Functional"].groupby("so_name")["id"].nunique().to_dict()
+    today_reads = readings_df[readings_df["reading_date"] == today_iso]
+    present_jm_today_map = {so: int(today_reads[today_reads["so_name"] == so]["jalmitra"].nunique())
+                            for so in so_metrics["so_name"].tolist()}
+    start = (datetime.date.fromisoformat(today_iso) - datetime.timedelta(days=period - 1)).isoformat()
+    window_reads = readings_df[(readings_df["reading_date"] >= start) & (readings_df["reading_date"] <= today_iso)]
+    schemes_updated_map = {so: int(window_reads[window_reads["so_name"] == so]["scheme_id"].nunique())
+                           for so in so_metrics["so_name"].tolist()}
+    so_metrics["Total Schemes"] = so_metrics["so_name"].apply(lambda x: int(total_schemes_map.get(x, 0)))
+    so_metrics["Functional Schemes"] = so_metrics["so_name"].apply(lambda x: int(func_schemes_map.get(x, 0)))
+    so_metrics["Non-Functional Schemes"] = so_metrics.apply(lambda row: int(row["Total Schemes"] - row["Functional Schemes"]), axis=1)
+    so_metrics["Present Jalmitra (Today)"] = so_metrics["so_name"].apply(lambda x: int(present_jm_today_map.get(x, 0)))
+    so_metrics[f"Schemes Updated (last {period}d)"] = so_metrics["so_name"].apply(
+        lambda x: int(min(schemes_updated_map.get(x, 0), total_schemes_map.get(x, 0))))
+    so_metrics["Score of SO"] = so_metrics["so_score"]
+    return so_metrics
+
+
+def best_of(fn, repeat=3):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return min(times), out
+
+
+def main():
+    print(f"{READINGS_PER_SO:,} window rows per SO, {PERIOD}-day window")
+    print(f"{'SOs':>5} {'rows':>11} {'legacy s':>10} {'grouped s':>10} {'grouped us/SO':>14} {'speedup':>8}")
+    for num_sos in (10, 30, 100, 300):
+        so_metrics, schemes, rows, today_iso = synthetic(num_sos)
+        t_old, old = best_of(lambda: legacy_summary(so_metrics, schemes, rows, today_iso, PERIOD), repeat=1)
+        t_new, new = best_of(lambda: aee_so_summary(so_metrics, schemes, rows, today_iso, PERIOD))
+        pd.testing.assert_frame_equal(old, new, check_dtype=False)
+        print(f"{num_sos:>5} {len(rows):>11,} {t_old:>10.3f} {t_new:>10.3f} {1e6 * t_new / num_sos:>14.0f} {t_old / t_new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+# bench_compute_metrics.py
+# Per-SO window metrics: the merge-based compute_metrics the app used before vs jjm_engine.compute_metrics,
+# on messy synthetic readings (blank / missing so_name, missing scheme_name, unknown scheme ids, NaN
+# jalmitra and water). The metrics of both are checked equal before timing is reported.
+# Run from the repo root:  python benchmarks/bench_compute_metrics.py [--readings 1000000]
+
+import argparse
+import datetime
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jjm_engine import compute_metrics, ensure_columns  # noqa: E402
+
+TODAY = "2024-03-31"
+PERIOD = 7
+
+
+def synthetic(num_sos: int, n: int, schemes_per_so: int = 50, days: int = 40, seed: int = 42,
+              messy: bool = True) -> tuple:
+    """
+    Schemes and `n` readings ending TODAY, spread over `num_sos` SOs. `messy` blanks or drops so_name
+    on some readings (the scheme's SO applies), drops scheme_name, and adds readings of unknown schemes
+    and with NaN jalmitra / water_quantity.
+    """
+    rng = np.random.default_rng(seed)
+    sos = np.array([f"SO {i}" for i in range(num_sos)], dtype=object)
+    n_schemes = num_sos * schemes_per_so
+    ids = np.arange(1, n_schemes + 1)
+    schemes = pd.DataFrame({
+        "id": ids,
+        "scheme_name": [f"Scheme {i}" for i in ids],
+        "functionality": np.where(rng.random(n_schemes) < 0.75, "Functional", "Non-Functional"),
+        "so_name": np.repeat(sos, schemes_per_so),
+        "ideal_per_day": rng.uniform(20.0, 100.0, n_schemes).round(2),
+        "scheme_label": [f"Village {i % 97} PWSS" for i in ids],
+    })
+    sid = rng.integers(1, n_schemes + 1, n)
+    jalmitras = np.array([f"JM_{i}" for i in range(n_schemes)], dtype=object)[(sid - 1 + rng.integers(0, 2, n)) % n_schemes]
+    end = datetime.date.fromisoformat(TODAY)
+    dates = np.array([(end - datetime.timedelta(days=d)).isoformat() for d in range(days)], dtype=object)
+    readings = pd.DataFrame({
+        "id": np.arange(1, n + 1),
+        "scheme_id": sid,
+        "jalmitra": jalmitras,
+        "reading": rng.integers(100_000, 250_000, n),
+        "reading_date": dates[rng.integers(0, days, n)],
+        "reading_time": "9:00 AM",
+        "water_quantity": rng.uniform(10.0, 100.0, n).round(2),
+        "scheme_name": schemes["scheme_label"].to_numpy()[sid - 1],
+        "so_name": schemes["so_name"].to_numpy()[sid - 1],
+    })
+    if messy:
+        u = rng.random(n)
+        readings.loc[u < 0.05, "so_name"] = ""
+        readings.loc[(u >= 0.05) & (u < 0.08), "so_name"] = None
+        readings.loc[rng.random(n) < 0.10, "scheme_name"] = None
+        readings.loc[rng.random(n) < 0.02, "scheme_id"] = n_schemes + rng.integers(1, 100)
+        readings.loc[rng.random(n) < 0.01, "jalmitra"] = None
+        readings.loc[rng.random(n) < 0.01, "water_quantity"] = np.nan
+    return readings, schemes
+
+
+def as_categorical(readings: pd.DataFrame) -> pd.DataFrame:
+    """The readings with their text columns as categoricals (as the store's compact frames hold them)."""
+    return readings.astype({c: "category" for c in ("jalmitra", "scheme_name", "so_name", "reading_date")})
+
+
+def window(period: int, today: str = TODAY) -> tuple:
+    end = datetime.date.fromisoformat(today)
+    return (end - datetime.timedelta(days=period - 1)).isoformat(), end.isoformat()
+
+
+def legacy_compute_metrics(readings: pd.DataFrame, schemes: pd.DataFrame, so: str, start: str, end: str):
+    """The merge-based compute_metrics the app used before (returns (filtered_merged_rows, metrics_df))."""
+    # Ensure input frames have the expected columns
+    r = ensure_columns(readings.copy() if readings is not None else pd.DataFrame(), [
+        "id", "scheme_id", "jalmitra", "reading", "reading_date", "reading_time", "water_quantity", "scheme_name", "so_name"
+    ])
+    s = ensure_columns(schemes.copy() if schemes is not None else pd.DataFrame(), [
+        "id", "scheme_name", "functionality", "so_name", "ideal_per_day", "scheme_label"
+    ])
+
+    # Merge on scheme id (left=readings, right=schemes). Right-side 'id' will be suffixed if conflicts.
+    merged = r.merge(
+        s[["id", "scheme_name", "functionality", "so_name", "ideal_per_day", "scheme_label"]],
+        left_on="scheme_id", right_on="id", how="left", suffixes=("_reading", "_scheme")
+    )
+
+    def col_or_empty(df, colname, fallback=""):
+        if colname in df.columns:
+            return df[colname]
+        else:
+            return pd.Series([fallback] * len(df), index=df.index)
+
+    # unify fields into consistent column names
+    so_reading = col_or_empty(merged, "so_name_reading")
+    so_scheme = col_or_empty(merged, "so_name_scheme")
+    merged["so_name"] = so_reading.fillna("").replace("", np.nan).fillna(so_scheme.fillna("").astype(str)).fillna("").astype(str)
+
+    scheme_name_reading = col_or_empty(merged, "scheme_name_reading")
+    scheme_name_scheme = col_or_empty(merged, "scheme_name_scheme")
+    merged["Scheme Display"] = scheme_name_reading.combine_first(scheme_name_scheme).fillna(merged.get("scheme_name", ""))
+
+    # ensure functionality and ideal_per_day available
+    merged["functionality"] = col_or_empty(merged, "functionality").fillna("")
+    merged["ideal_per_day"] = pd.to_numeric(col_or_empty(merged, "ideal_per_day", 0.0), errors="coerce").fillna(0.0)
+
+    # filter to functional schemes for this SO and date window
+    mask = (
+        (merged.get("functionality", "") == "Functional")
+        & (merged.get("so_name", "") == so)
+        & (merged.get("reading_date", "") >= start)
+        & (merged.get("reading_date", "") <= end)
+    )
+    lastN = merged.loc[mask].copy()
+    if lastN.empty:
+        empty_metrics = pd.DataFrame(columns=["jalmitra", "days_updated", "total_water_m3", "schemes_covered", "ideal_total_Nd", "quantity_score"])
+        return lastN, empty_metrics
+
+    # compute days_count safely
+    try:
+        days_count = (pd.to_datetime(end) - pd.to_datetime(start)).days + 1
+        if days_count <= 0:
+            days_count = 1
+    except Exception:
+        days_count = 7
+
+    # normalize numeric columns
+    lastN["water_quantity"] = pd.to_numeric(lastN.get("water_quantity", 0.0), errors="coerce").fillna(0.0).round(2)
+    lastN["ideal_per_day"] = pd.to_numeric(lastN.get("ideal_per_day", 0.0), errors="coerce").fillna(0.0)
+
+    # aggregate per jalmitra
+    agg = lastN.groupby("jalmitra").agg(
+        days_updated=("reading_date", lambda x: x.nunique()),
+        total_water_m3=("water_quantity", "sum"),
+        schemes_covered=("scheme_id", lambda x: x.nunique())
+    ).reset_index()
+
+    # compute ideal contributions per unique (jalmitra, scheme) pair across the window
+    scheme_ideal = lastN[["jalmitra", "scheme_id", "ideal_per_day"]].drop_duplicates(subset=["jalmitra", "scheme_id"])
+    scheme_ideal["ideal_Nd"] = pd.to_numeric(scheme_ideal["ideal_per_day"], errors="coerce").fillna(0.0) * float(days_count)
+    ideal_sum = scheme_ideal.groupby("jalmitra")["ideal_Nd"].sum().reset_index().rename(columns={"ideal_Nd": "ideal_total_Nd"})
+
+    metrics = agg.merge(ideal_sum, on="jalmitra", how="left")
+    metrics["ideal_total_Nd"] = metrics["ideal_total_Nd"].fillna(0.0).round(2)
+
+    # quantity score = min(total_water / ideal_total_Nd, 1.0) (0 if ideal_total_Nd <= 0)
+    def compute_qs(row):
+        ideal = float(row.get("ideal_total_Nd", 0.0) or 0.0)
+        water = float(row.get("total_water_m3", 0.0) or 0.0)
+        if ideal <= 0:
+            return 0.0
+        return min(water / ideal, 1.0)
+
+    metrics["quantity_score"] = metrics.apply(compute_qs, axis=1)
+    metrics["days_updated"] = metrics["days_updated"].astype(int)
+    metrics["total_water_m3"] = metrics["total_water_m3"].astype(float).round(2)
+    metrics["quantity_score"] = metrics["quantity_score"].astype(float).round(3)
+    metrics.attrs["days_count"] = days_count
+
+    return lastN, metrics
+
+
+def assert_same_metrics(old: pd.DataFrame, new: pd.DataFrame):
+    """Metrics frames equal up to dtype (jalmitra stays categorical when the readings' column is)."""
+    new = new.astype({c: object for c in new.columns if isinstance(new[c].dtype, pd.CategoricalDtype)})
+    pd.testing.assert_frame_equal(old, new, check_dtype=False)
+
+
+def best_of(fn, repeat=3):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return min(times), out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Legacy vs columnar compute_metrics on messy readings.")
+    parser.add_argument("--readings", type=int, default=1_000_000)
+    args = parser.parse_args()
+    start, end = window(PERIOD)
+    print(f"{args.readings:,} messy readings, {PERIOD}-day window ending {end}")
+    print(f"{'case':<28} {'legacy s':>10} {'columnar s':>11} {'speedup':>8}")
+    # the legacy version always gets object columns (its string date filter cannot run on categoricals)
+    cases = [("30 SOs", 30, 50, False), ("one SO, object columns", 1, 1500, False),
+             ("one SO, categorical", 1, 1500, True)]
+    for label, num_sos, schemes_per_so, categorical in cases:
+        readings, schemes = synthetic(num_sos, args.readings, schemes_per_so)
+        fast = as_categorical(readings) if categorical else readings
+        t_old, (_, old) = best_of(lambda: legacy_compute_metrics(readings, schemes, "SO 0", start, end), repeat=1)
+        t_new, (_, new) = best_of(lambda: compute_metrics(fast, schemes, "SO 0", start, end))
+        assert_same_metrics(old, new)
+        print(f"{label:<28} {t_old:>10.3f} {t_new:>11.3f} {t_old / t_new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# bench_suite.py
+# Headless benchmark suite: generators, compute_metrics, the AEE window rankings / summary, the
+# today present/absent path and the meter checks on seeded district datasets (10k - 10M readings, 1 - 500 SOs).
+# Reports throughput, latency percentiles and peak memory, and writes the results to a JSON file.
+# Run from the repo root:  python benchmarks/bench_suite.py [--sizes 10k,100k,1m] [--sos 1,10,100,500]
+#                          [--repeat 5] [--workers 16] [--out results.json] [--compare older.json]
+# --sizes 10m needs 8+ GB of RAM (the window rankings case does not fit in 5 GB at 10M rows).
+
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jjm_demo import district_layout, iter_district_readings  # noqa: E402
+from jjm_engine import WINDOWS, aee_so_summary, compute_metrics, precompute_windows, present_absent  # noqa: E402
+from jjm_index import build_so_indexes  # noqa: E402
+from jjm_meter import meter_deltas  # noqa: E402
+from jjm_parallel import parallel_windows  # noqa: E402
+from jjm_store import ROLLUP_COLUMNS, ROLLUP_KEYS, compact_readings, enrich_readings, expand_readings  # noqa: E402
+from jjm_today import TodayTracker  # noqa: E402
+
+DAYS = 30
+MEAN_UPDATE_PROB = 0.525      # midpoint of the generator's per-jalmitra (0.10, 0.95) update probability
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def parse_count(text: str) -> int:
+    """'10k' -> 10_000, '1m' -> 1_000_000, '500' -> 500."""
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+
+# ---------- datasets ----------
+def build_dataset(rows: int, n_sos: int, seed: int = 42) -> dict:
+    """
+    A district of `n_sos` SOs with about `rows` readings over DAYS days (schemes per SO sized to fit).
+    Derived frames (compact daily rollup, enriched rows, mappings, the first SO's rollup in storage form as
+    so_window_metrics passes it to compute_metrics) are built here once, outside the timed cases.
+    """
+    schemes_per_so = max(1, math.ceil(rows / (n_sos * DAYS * MEAN_UPDATE_PROB)))
+    layout = district_layout(1, n_sos, schemes_per_so, seed)
+    readings = pd.concat(list(iter_district_readings(layout, DAYS, seed=seed)), ignore_index=True)
+
+    # daily rollup as the store keeps it (water rounded to the litre per reading, summed per key)
+    rollup = (readings[ROLLUP_KEYS].assign(water_quantity=readings["water_quantity"].astype(np.float64).round(2))
+              .groupby(ROLLUP_KEYS, observed=True, sort=False)
+              .agg(water_quantity=("water_quantity", "sum"), n_readings=("water_quantity", "size")).reset_index())
+    rollup = compact_readings(rollup[ROLLUP_COLUMNS])
+    first_so = layout["hierarchy"]["so_name"].iloc[0]
+    jalmitras_map = layout["assignments"].groupby("so_name", sort=False)["jalmitra"].agg(list).to_dict()
+    return {"layout": layout, "readings": readings, "rollup": rollup,
+            "so_rollup": expand_readings(rollup[(rollup["so_name"] == first_so).to_numpy()]),
+            "enriched": enrich_readings(readings, layout["schemes"]), "jalmitras_map": jalmitras_map,
+            "so_names": layout["hierarchy"]["so_name"].tolist(), "schemes_per_so": schemes_per_so}
+
+
+# ---------- cases: name -> (rows processed, callable) ----------
+def cases(data: dict, seed: int, workers: int = 1) -> dict:
+    schemes, today = data["layout"]["schemes"], datetime.date.today()
+    start7 = (today - datetime.timedelta(days=6)).isoformat()
+    so = data["so_names"][0]
+    indexes = build_so_indexes(data["layout"]["assignments"], schemes)
+    so_metrics = {}           # aee_so_summary's input, computed on its first (warm-up) run only
+    enriched = data["enriched"]
+    is_today = (enriched["reading_date"] == np.datetime64(today.isoformat(), "s")).to_numpy()
+    meter = {}                # per-scheme meter state after every reading before today (first run only)
+
+    def meter_today():
+        if "state" not in meter:
+            meter["state"] = meter_deltas(enriched[~is_today])[1]
+        return meter_deltas(enriched[is_today], meter["state"])
+
+    def summary():
+        if not so_metrics:
+            windows = precompute_windows(data["rollup"], schemes, data["jalmitras_map"], today.isoformat())
+            so_metrics["7"] = windows[WINDOWS[0]]["so_metrics"]
+        return aee_so_summary(so_metrics["7"], schemes, data["rollup"], today.isoformat(), WINDOWS[0])
+
+    def generate():
+        layout = district_layout(1, len(data["so_names"]), data["schemes_per_so"], seed)
+        return sum(len(b) for b in iter_district_readings(layout, DAYS, seed=seed))
+
+    def today_split():
+        tracker = TodayTracker()
+        tracker.reset(today.isoformat(), data["enriched"])
+        return sum(len(present_absent(idx.master, tracker.present(name, functional=True))[1])
+                   for name, idx in indexes.items())
+
+    out = {
+        "generate_district": (len(data["readings"]), generate),
+        "compute_metrics (1 SO rollup, 7d)": (
+            len(data["so_rollup"]), lambda: compute_metrics(data["so_rollup"], schemes, so, start7, today.isoformat())),
+        "precompute_windows (all SOs, 7/15/30d)": (
+            len(data["rollup"]), lambda: precompute_windows(data["rollup"], schemes, data["jalmitras_map"], today.isoformat())),
+        "aee_so_summary (7d)": (len(data["rollup"]), summary),
+        "present/absent today (all SOs)": (len(data["enriched"]), today_split),
+        "meter deltas (full history)": (len(enriched), lambda: meter_deltas(enriched)),
+        "meter deltas (incremental, today)": (int(is_today.sum()), meter_today),
+    }
+    if workers > 1:
+        out[f"precompute_windows ({workers} processes)"] = (
+            len(data["rollup"]),
+            lambda: parallel_windows(data["rollup"], schemes, data["jalmitras_map"], today.isoformat(), workers=workers))
+    return out
+
+
+# ---------- measurement ----------
+def measure(fn, repeat: int, rows: int) -> dict:
+    """Wall-time percentiles over `repeat` runs, then one run under tracemalloc for peak Python/NumPy memory."""
+    fn()                                           # warm-up (imports, first-touch allocations)
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    t = np.array(times)
+    p50 = float(np.percentile(t, 50))
+    return {"rows": rows, "repeat": repeat, "min_s": float(t.min()), "p50_s": p50,
+            "p90_s": float(np.percentile(t, 90)), "p99_s": float(np.percentile(t, 99)), "max_s": float(t.max()),
+            "rows_per_sec": rows / p50 if p50 > 0 else None, "peak_mb": peak / 2**20}
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=False).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+            "platform": platform.platform(), "cpus": os.cpu_count(), "commit": commit}
+
+
+def compare(results: list, older_path: str):
+    """Print p50 ratios (new / old) for the cases both result files share."""
+    with open(older_path, encoding="utf-8") as fh:
+        older = {(r["case"], r["target_rows"], r["sos"]): r for r in json.load(fh)["results"]}
+    print(f"\nvs {os.path.basename(older_path)} (p50 new/old; < 1 is faster)")
+    for r in results:
+        old = older.get((r["case"], r["target_rows"], r["sos"]))
+        if old and old["p50_s"] > 0:
+            print(f"  {r['case']:<42} {r['target_rows']:>10,} rows {r['sos']:>4} SOs  {r['p50_s'] / old['p50_s']:6.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the JJM engine on synthetic district datasets.")
+    parser.add_argument("--sizes", default="10k,100k,1m", help="target readings per dataset (e.g. 10k,100k,1m,10m)")
+    parser.add_argument("--sos", default="1,10,100,500", help="SO counts per dataset")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case (capped at 3 from 1M rows)")
+    parser.add_argument("--workers", type=int, default=1, help="also time precompute_windows in this many processes")
+    parser.add_argument("--case", default=None, help="only cases whose name contains this text")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=None, help="results JSON (default: benchmarks/results/bench-<time>.json)")
+    parser.add_argument("--compare", default=None, help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    out = args.out or os.path.join(RESULTS_DIR, f"bench-{datetime.datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    run = {"created": datetime.datetime.now().isoformat(timespec="seconds"), "environment": environment(),
+           "days": DAYS, "results": []}
+    results = run["results"]
+    print(f"{'case':<42} {'rows':>10} {'SOs':>4} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'rows/s':>13} {'peak MB':>8}")
+    for target in [parse_count(x) for x in args.sizes.split(",")]:
+        for n_sos in [parse_count(x) for x in args.sos.split(",")]:
+            data = build_dataset(target, n_sos, args.seed)
+            repeat = min(args.repeat, 3) if target >= 1_000_000 else args.repeat
+            for name, (rows, fn) in cases(data, args.seed, args.workers).items():
+                if args.case and args.case not in name:
+                    continue
+                r = {"case": name, "target_rows": target, "sos": n_sos, **measure(fn, repeat, rows)}
+                results.append(r)
+                with open(out, "w", encoding="utf-8") as fh:     # rewritten per case: a killed run keeps its results
+                    json.dump(run, fh, indent=1)
+                print(f"{name:<42} {rows:>10,} {n_sos:>4} {1e3 * r['p50_s']:>9.1f} {1e3 * r['p90_s']:>9.1f} "
+                      f"{1e3 * r['p99_s']:>9.1f} {r['rows_per_sec'] or 0:>13,.0f} {r['peak_mb']:>8.1f}")
+            del data
+
+    print(f"\nresults -> {out}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# ingest_load.py
+# Load-test client for jjm_service.py: many concurrent keep-alive connections submit a morning burst of
+# BFM readings for the store's assigned jalmitras, with a share of retried (duplicate) submissions.
+# Reports submission throughput, request latency percentiles, result statuses, 429 retries and the
+# service's batching counters. Start the service first, then from the repo root:
+#   python benchmarks/ingest_load.py [--readings 20000] [--concurrency 500] [--per-request 1] [--dup-rate 0.05]
+
+import argparse
+import asyncio
+import collections
+import datetime
+import json
+import os
+import random
+import sys
+import time
+import uuid
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jjm_demo import BFM_READINGS, TIME_SLOTS  # noqa: E402
+from jjm_store import ReadingsStore, minutes_to_time  # noqa: E402
+
+
+async def request(reader, writer, method: str, path: str, payload=None) -> tuple:
+    """One HTTP/1.1 request on a keep-alive connection; returns (status, headers, decoded JSON body)."""
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: jjm\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    data = await reader.readexactly(int(headers.get("content-length", 0)))
+    return status, headers, json.loads(data or b"null")
+
+
+def make_submissions(assignments: list, n: int, dup_rate: float, seed: int) -> list:
+    """`n` readings for today; about `dup_rate` of them re-send an earlier reading with the same key."""
+    rnd = random.Random(seed)
+    today = datetime.date.today().isoformat()
+    times = minutes_to_time(TIME_SLOTS)
+    out = []
+    for _ in range(n):
+        if out and rnd.random() < dup_rate:
+            out.append(rnd.choice(out))
+            continue
+        sid, jm = rnd.choice(assignments)
+        out.append({"idempotency_key": uuid.UUID(int=rnd.getrandbits(128)).hex, "scheme_id": int(sid),
+                    "jalmitra": jm, "reading": int(rnd.choice(BFM_READINGS)), "reading_date": today,
+                    "reading_time": str(rnd.choice(times)), "water_quantity": round(rnd.uniform(20.0, 100.0), 2)})
+    return out
+
+
+async def run(host: str, port: int, submissions: list, concurrency: int, per_request: int) -> dict:
+    requests = [submissions[i:i + per_request] for i in range(0, len(submissions), per_request)]
+    queue = collections.deque(requests)
+    latencies, statuses, retries = [], collections.Counter(), [0]
+
+    async def worker():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while queue:
+                items = queue.popleft()
+                t0 = time.perf_counter()
+                while True:
+                    status, headers, body = await request(reader, writer, "POST", "/readings", items)
+                    if status != 429:
+                        break
+                    retries[0] += 1
+                    await asyncio.sleep(float(headers.get("retry-after", 1)) * random.uniform(0.5, 1.5))
+                latencies.append(time.perf_counter() - t0)
+                if status == 200:
+                    statuses.update(r["status"] for r in body["results"])
+                else:
+                    statuses[f"http {status}"] += len(items)
+        finally:
+            writer.close()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(min(concurrency, len(requests)))])
+    seconds = time.perf_counter() - t0
+    reader, writer = await asyncio.open_connection(host, port)
+    _, _, server = await request(reader, writer, "GET", "/stats")
+    writer.close()
+    lat = np.array(latencies) * 1e3
+    return {"readings": len(submissions), "requests": len(requests), "seconds": round(seconds, 3),
+            "readings_per_sec": round(len(submissions) / seconds, 1),
+            "latency_ms": {q: round(float(np.percentile(lat, int(q[1:]))), 1) for q in ("p50", "p90", "p99")},
+            "statuses": dict(statuses), "retries_429": retries[0], "server": server}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Burst load test for the JJM ingest service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db", default=None, help="store to take jalmitra / scheme assignments from")
+    parser.add_argument("--readings", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=500, help="simultaneous client connections")
+    parser.add_argument("--per-request", type=int, default=1, help="readings per POST")
+    parser.add_argument("--dup-rate", type=float, default=0.05, help="share of retried (duplicate) submissions")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    assignments = ReadingsStore(args.db, cache_readings=False).assignments()
+    if assignments.empty:
+        sys.exit("No jalmitra assignments in the store: generate demo data first.")
+    pairs = list(assignments[["scheme_id", "jalmitra"]].itertuples(index=False, name=None))
+    submissions = make_submissions(pairs, args.readings, args.dup_rate, args.seed)
+    report = asyncio.run(run(args.host, args.port, submissions, args.concurrency, args.per_request))
+    print(json.dumps(report, indent=1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+# jjm_archive.py
+# On-disk Parquet archive of the readings, hive-partitioned by month and SO
+# (root/month=2024-01/so_name=ROKI%20RAY/part-*.parquet, zstd, rows sorted by date inside each file).
+# A manifest keeps per-partition row counts and min/max date / id, so a (so_name, date window) query
+# opens only the partitions it overlaps, reads only the columns it needs, and the Parquet row-group
+# statistics skip the rest of the month. The dashboards' daily rollup can be read from here instead
+# of the database: set JJM_ARCHIVE_DIR, or run
+#   python jjm_archive.py sync ROOT [--db URL]
+#   python jjm_archive.py scan ROOT [--so NAME] [--start ISO] [--end ISO]
+
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError as exc:
+    raise ImportError("The Parquet archive needs pyarrow (pip install pyarrow)") from exc
+
+from jjm_store import READING_COLUMNS, ROLLUP_COLUMNS, ROLLUP_KEYS, ReadingsStore, compact_readings
+
+ARCHIVE_DIR = os.environ.get("JJM_ARCHIVE_DIR")     # read the dashboards' rollup from this archive when set
+MANIFEST = "_manifest.json"                         # "_" prefix: skipped by pyarrow dataset discovery
+ROW_GROUP_ROWS = 64_000                             # small enough for date statistics to prune inside a month
+
+PARTITIONING = ds.partitioning(pa.schema([("month", pa.string()), ("so_name", pa.string())]), flavor="hive")
+SCHEMA = pa.schema([
+    ("id", pa.int64()), ("scheme_id", pa.int64()), ("jalmitra", pa.string()), ("reading", pa.int64()),
+    ("reading_date", pa.date32()), ("reading_time", pa.string()), ("water_quantity", pa.float64()),
+    ("scheme_name", pa.string()), ("so_name", pa.string()), ("month", pa.string()),
+])
+
+
+def _partition_key(month: str, so: str) -> str:
+    """Directory of a partition relative to the root, as pyarrow writes it (URI-escaped, nulls as the hive default)."""
+    expr = [ds.field(name).is_null() if value is None else ds.field(name) == value
+            for name, value in (("month", month), ("so_name", so))]
+    return PARTITIONING.format(expr[0] & expr[1])[0]
+
+
+class ReadingsArchive:
+    """
+    Month x SO partitioned Parquet copy of the readings table.
+      sync(store)                      append readings past the last archived id (rebuild after a store clear)
+      readings(so, start, end, ...)    rows for a (so_name, inclusive ISO window), storage form or compact
+      rollup(so, start, end, ...)      the daily rollup of that slice, as ReadingsStore.rollup() returns it
+      plan(so, start, end)             partitions a query would open, with the manifest statistics
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+        self._synced_version = None
+        self.manifest = self._load_manifest()
+        self.last_scan = {}
+
+    # ---------- manifest ----------
+    def _load_manifest(self) -> dict:
+        try:
+            with open(os.path.join(self.root, MANIFEST), encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {"epoch": None, "last_id": 0, "rows": 0, "partitions": {}}
+
+    def _save_manifest(self):
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, MANIFEST)
+        with open(path + ".tmp", "w", encoding="utf-8") as fh:
+            json.dump(self.manifest, fh, indent=1, sort_keys=True)
+        os.replace(path + ".tmp", path)
+
+    def clear(self):
+        """Remove every partition and reset the manifest (the next sync rebuilds from the store)."""
+        with self._lock:
+            self._clear()
+            self._synced_version = None
+
+    def _clear(self, epoch: int = None):
+        for name in os.listdir(self.root) if os.path.isdir(self.root) else ():
+            if name.startswith("month="):
+                shutil.rmtree(os.path.join(self.root, name))
+        self.manifest = {"epoch": epoch, "last_id": 0, "rows": 0, "partitions": {}}
+        self._save_manifest()
+
+    # ---------- writes ----------
+    def sync(self, store: ReadingsStore, chunksize: int = 100_000) -> int:
+        """
+        Bring the archive up to date with `store`: readings past the last archived id are written as one
+        new file per touched partition. The manifest records the store's clear epoch; if the store was
+        cleared since (by any process, however many rows it holds now) or no longer holds exactly the
+        archived rows, the archive is rebuilt. Returns the number of rows written.
+        """
+        version = store.version()
+        if version == self._synced_version:
+            return 0
+        with self._lock:
+            if version == self._synced_version:
+                return 0
+            epoch = store.clear_epoch()
+            last_id = self.manifest["last_id"]
+            if (self.manifest.get("epoch") != epoch
+                    or (last_id and store.reading_count(upto_id=last_id) != self.manifest["rows"])):
+                self._clear(epoch)
+                last_id = 0
+            written = self.write(store.iter_readings(chunksize=chunksize, after_id=last_id))
+            self._synced_version = version
+            return written
+
+    def write(self, chunks) -> int:
+        """Append an iterable of storage-form readings frames (ids ascending, past the last archived id)."""
+        stats, state = {}, {"rows": 0, "last_id": self.manifest["last_id"]}
+
+        def _batches():
+            for chunk in chunks:
+                if chunk.empty:
+                    continue
+                table = _to_table(chunk)
+                _fold_stats(stats, table)
+                state["rows"] += table.num_rows
+                state["last_id"] = max(state["last_id"], int(chunk["id"].max()))
+                yield from table.to_batches()
+
+        first_id = self.manifest["last_id"] + 1
+        ds.write_dataset(
+            _batches(), self.root, schema=SCHEMA, format="parquet", partitioning=PARTITIONING,
+            basename_template=f"part-{first_id:010d}-{{i}}.parquet", existing_data_behavior="overwrite_or_ignore",
+            file_options=ds.ParquetFileFormat().make_write_options(compression="zstd"),
+            max_rows_per_group=ROW_GROUP_ROWS, min_rows_per_group=min(ROW_GROUP_ROWS, 16_384),
+        )
+        if not state["rows"]:
+            return 0
+        partitions = self.manifest["partitions"]
+        for key, st in stats.items():
+            p = partitions.setdefault(key, {**st, "rows": 0})
+            _merge_stats(p, st)
+            p["files"] = _files_in(self.root, key)
+            p["bytes"] = sum(os.path.getsize(os.path.join(self.root, key, f)) for f in p["files"])
+        self.manifest["rows"] += state["rows"]
+        self.manifest["last_id"] = state["last_id"]
+        self._save_manifest()
+        return state["rows"]
+
+    # ---------- reads ----------
+    def plan(self, so: str = None, start: str = None, end: str = None) -> list:
+        """Manifest entries (with their "key") of the partitions overlapping `so` and the inclusive window."""
+        out = []
+        for key, p in self.manifest["partitions"].items():
+            if so is not None and p["so_name"] != so:
+                continue
+            if start is not None and (p["max_date"] is None or p["max_date"] < start):
+                continue
+            if end is not None and (p["min_date"] is None or p["min_date"] > end):
+                continue
+            out.append({"key": key, **p})
+        return out
+
+    def _scan(self, columns: list, so: str = None, start: str = None, end: str = None) -> pa.Table:
+        parts = self.plan(so, start, end)
+        files = [os.path.join(self.root, p["key"], f) for p in parts for f in p["files"]]
+        self.last_scan = {"partitions": len(parts), "of_partitions": len(self.manifest["partitions"]),
+                          "bytes": sum(p["bytes"] for p in parts),
+                          "of_bytes": sum(p["bytes"] for p in self.manifest["partitions"].values()),
+                          "columns": list(columns)}
+        if not files:
+            return SCHEMA.empty_table().select(columns)
+        dataset = ds.dataset(files, schema=SCHEMA, format="parquet", partitioning=PARTITIONING,
+                             partition_base_dir=self.root)
+        flt = None
+        for expr in (ds.field("so_name") == so if so is not None else None,
+                     ds.field("reading_date") >= pa.scalar(pd.Timestamp(start).date(), pa.date32()) if start else None,
+                     ds.field("reading_date") <= pa.scalar(pd.Timestamp(end).date(), pa.date32()) if end else None):
+            if expr is not None:
+                flt = expr if flt is None else flt & expr
+        return dataset.to_table(columns=columns, filter=flt)
+
+    def readings(self, so: str = None, start: str = None, end: str = None, columns: list = None,
+                 compact: bool = False) -> pd.DataFrame:
+        """Like ReadingsStore.readings(): rows for an optional SO and inclusive ISO window, in id order."""
+        columns = list(columns or READING_COLUMNS)
+        table = self._scan(list(dict.fromkeys(columns + ["id"])), so, start, end).sort_by("id")
+        df = _to_frame(table.select(columns))
+        return compact_readings(df) if compact else df
+
+    def rollup(self, so: str = None, start: str = None, end: str = None, compact: bool = False) -> pd.DataFrame:
+        """Like ReadingsStore.rollup(): per (so_name, reading_date, jalmitra, scheme_id) water sum and count."""
+        rows = _to_frame(self._scan(ROLLUP_KEYS + ["water_quantity"], so, start, end))
+        rows["water_quantity"] = pd.to_numeric(rows["water_quantity"], errors="coerce").fillna(0.0).round(2)
+        rows = rows.dropna(subset=ROLLUP_KEYS)
+        df = (rows.groupby(ROLLUP_KEYS, sort=True)
+              .agg(water_quantity=("water_quantity", "sum"), n_readings=("water_quantity", "size"))
+              .reset_index()[ROLLUP_COLUMNS])
+        return compact_readings(df) if compact else df
+
+
+def _to_table(chunk: pd.DataFrame) -> pa.Table:
+    """Storage-form readings as an Arrow table in SCHEMA (date32 dates plus the month partition), date-sorted."""
+    df = chunk[READING_COLUMNS].copy(deep=False)
+    dates = pd.to_datetime(df["reading_date"], errors="coerce")
+    df["reading_date"] = dates.dt.date.astype(object).where(dates.notna(), None)
+    df["month"] = dates.dt.strftime("%Y-%m").astype(object).where(dates.notna(), None)
+    for c in ("jalmitra", "reading_time", "scheme_name", "so_name"):
+        df[c] = df[c].astype(object).where(df[c].notna(), None)
+    table = pa.Table.from_pandas(df, schema=SCHEMA, preserve_index=False)
+    return table.sort_by([("reading_date", "ascending"), ("id", "ascending")])
+
+
+def _to_frame(table: pa.Table) -> pd.DataFrame:
+    """Arrow rows back to the storage form: ISO date text, plain object strings."""
+    if "reading_date" in table.column_names:
+        i = table.column_names.index("reading_date")
+        table = table.set_column(i, "reading_date", table["reading_date"].cast(pa.string()))
+    return table.to_pandas()
+
+
+def _fold_stats(stats: dict, table: pa.Table):
+    """Accumulate per-partition rows / min-max date and id from one batch."""
+    df = table.select(["month", "so_name", "reading_date", "id"]).to_pandas()
+    grouped = df.groupby(["month", "so_name"], dropna=False, sort=False).agg(
+        rows=("id", "size"), min_id=("id", "min"), max_id=("id", "max"),
+        min_date=("reading_date", "min"), max_date=("reading_date", "max"))
+    for (month, so), r in grouped.iterrows():
+        month = None if pd.isna(month) else month
+        so = None if pd.isna(so) else so
+        key = _partition_key(month, so)
+        s = {"month": month, "so_name": so, "rows": int(r["rows"]), "min_id": int(r["min_id"]), "max_id": int(r["max_id"]),
+             "min_date": None if pd.isna(r["min_date"]) else r["min_date"].isoformat(),
+             "max_date": None if pd.isna(r["max_date"]) else r["max_date"].isoformat()}
+        _merge_stats(stats.setdefault(key, {**s, "rows": 0}), s)
+
+
+def _merge_stats(p: dict, s: dict):
+    """Fold partition statistics `s` into `p` (row counts add, min / max widen; None = no dates)."""
+    p["rows"] += s["rows"]
+    for k, pick in (("min_date", min), ("max_date", max), ("min_id", min), ("max_id", max)):
+        p[k] = s[k] if p[k] is None else p[k] if s[k] is None else pick(p[k], s[k])
+
+
+def _files_in(root: str, key: str) -> list:
+    path = os.path.join(root, key)
+    return sorted(f for f in os.listdir(path) if f.endswith(".parquet")) if os.path.isdir(path) else []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Month x SO partitioned Parquet archive of the JJM readings.")
+    parser.add_argument("command", choices=["sync", "scan"])
+    parser.add_argument("root")
+    parser.add_argument("--db", default=None, help="SQLAlchemy URL (default: JJM_DB_URL or local SQLite)")
+    parser.add_argument("--so", default=None, help="scan: only this Section Officer")
+    parser.add_argument("--start", default=None, help="scan: first reading date (ISO, inclusive)")
+    parser.add_argument("--end", default=None, help="scan: last reading date (ISO, inclusive)")
+    args = parser.parse_args()
+
+    archive = ReadingsArchive(args.root)
+    t0 = time.perf_counter()
+    if args.command == "sync":
+        rows = archive.sync(ReadingsStore(args.db, cache_readings=False))
+        print(f"{rows:,} readings archived in {time.perf_counter() - t0:.1f} s "
+              f"({archive.manifest['rows']:,} rows in {len(archive.manifest['partitions'])} partitions)")
+        return
+    rollup = archive.rollup(args.so, args.start, args.end)
+    scan = archive.last_scan
+    print(f"{len(rollup):,} rollup rows in {time.perf_counter() - t0:.2f} s; read {scan['partitions']} of "
+          f"{scan['of_partitions']} partitions, {scan['bytes'] / 1e6:.1f} of {scan['of_bytes'] / 1e6:.1f} MB "
+          f"({scan['bytes'] / max(scan['of_bytes'], 1):.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# jjm_blocks.py
+# Append-only, chunked in-memory readings: a list of immutable column blocks, consolidated lazily.
+# Appending a batch never copies earlier blocks; filtered views skip whole blocks by SO / date range.
+
+import threading
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+
+class ReadingBlocks:
+    """
+    Readings held as immutable DataFrame blocks (compact schema), oldest first.
+      append(block)  O(batch): the block and its SO set / date range are added to the list
+      view(...)      rows for an SO / inclusive date window, concatenating only blocks that can match
+    Consolidation is lazy and geometric: a new block is merged into its predecessor only while it is at
+    least as large, so block sizes stay decreasing, there are O(log n) blocks, and every row is copied
+    O(log n) times overall instead of once per append as with concat-on-append.
+    """
+
+    def __init__(self):
+        self._blocks = []          # [(frame, so_names frozenset, min_date, max_date)]
+        self._lock = threading.Lock()
+        self.rows = 0
+        self.last_id = 0
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def clear(self):
+        with self._lock:
+            self._blocks, self.rows, self.last_id = [], 0, 0
+
+    def append(self, block: pd.DataFrame):
+        if block.empty:
+            return
+        entry = _describe(block.reset_index(drop=True))
+        with self._lock:
+            self._blocks.append(entry)
+            self.rows += len(block)
+            if "id" in block.columns:
+                self.last_id = max(self.last_id, int(block["id"].max()))
+            while len(self._blocks) > 1 and len(self._blocks[-1][0]) >= len(self._blocks[-2][0]):
+                tail = self._blocks.pop()
+                self._blocks[-1] = _describe(_concat([self._blocks[-1][0], tail[0]]))
+
+    def view(self, so: str = None, start: str = None, end: str = None, columns: list = None) -> pd.DataFrame:
+        """Rows matching `so` and the inclusive ISO window (None = no filter), in append order."""
+        lo = np.datetime64(start, "s") if start is not None else None
+        hi = np.datetime64(end, "s") if end is not None else None
+        with self._lock:
+            blocks = list(self._blocks)
+        parts = []
+        for df, so_names, min_date, max_date in blocks:
+            if so is not None and so not in so_names:
+                continue
+            if (lo is not None and max_date < lo) or (hi is not None and min_date > hi):
+                continue
+            mask = np.ones(len(df), dtype=bool)
+            if so is not None:
+                mask &= (df["so_name"] == so).to_numpy()
+            if lo is not None:
+                mask &= (df["reading_date"] >= lo).to_numpy()
+            if hi is not None:
+                mask &= (df["reading_date"] <= hi).to_numpy()
+            part = df if mask.all() else df.loc[mask]
+            parts.append(part if columns is None else part[columns])
+        if not parts:
+            return None
+        return _concat([p for p in parts]) if len(parts) > 1 else parts[0].reset_index(drop=True)
+
+
+def _describe(df: pd.DataFrame) -> tuple:
+    so_names = frozenset()
+    if "so_name" in df.columns:
+        col = df["so_name"]
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            codes = col.cat.codes.to_numpy()
+            so_names = frozenset(col.cat.categories[np.unique(codes[codes >= 0])].astype(str))
+        else:
+            so_names = frozenset(pd.unique(col.dropna().astype(str)))
+    dates = df["reading_date"].to_numpy(dtype="datetime64[s]") if "reading_date" in df.columns else np.array([], "datetime64[s]")
+    valid = dates[~np.isnat(dates)]
+    if len(valid):
+        return df, so_names, valid.min(), valid.max()
+    return df, so_names, np.datetime64("NaT", "s"), np.datetime64("NaT", "s")
+
+
+def _concat(frames: list) -> pd.DataFrame:
+    """pd.concat that keeps categorical columns categorical (union of categories) without an object round trip."""
+    cats = [c for c in frames[0].columns if isinstance(frames[0][c].dtype, pd.CategoricalDtype)
+            and all(isinstance(f[c].dtype, pd.CategoricalDtype) for f in frames)]
+    out = pd.concat([f.drop(columns=cats) for f in frames], ignore_index=True)
+    for c in cats:
+        out[c] = union_categoricals([f[c] for f in frames], ignore_order=True)
+    return out[list(frames[0].columns)]
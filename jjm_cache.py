@@ -0,0 +1,97 @@
+# jjm_cache.py
+# Process-wide metrics cache shared by every session: keys start with the store's data version,
+# so a hit is an O(1) dict lookup (no hashing of DataFrames) and any write invalidates explicitly.
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class MetricsCache:
+    """
+    LRU + TTL cache for computed metrics, keyed by (data_version, *rest), e.g. (version, "rankings", today).
+    Values are shared, not copied: callers must treat them as read-only.
+    When a key with a newer data version arrives, every entry of older versions is dropped at once
+    (the store bumps the version on every generate / ingest / reset).
+    """
+
+    def __init__(self, max_entries: int = 128, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()      # key -> (stored_at, value)
+        self._lock = threading.Lock()
+        self._key_locks = {}               # key -> [lock, callers using it]
+        self._version = None
+        self.hits = self.misses = self.evictions = 0
+
+    def get_or_compute(self, key: tuple, compute):
+        """Return the cached value for `key`, computing it once (per key, across threads) on a miss."""
+        value = self._get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            holder = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            holder[1] += 1                               # the lock lives until its last waiter is done
+        try:
+            with holder[0]:
+                value = self._get(key, count_miss=False)    # another session may have filled it meanwhile
+                if value is None:
+                    value = compute()
+                    self._put(key, value)
+        finally:
+            with self._lock:
+                holder[1] -= 1
+                if not holder[1]:
+                    del self._key_locks[key]
+        return value
+
+    def invalidate(self, version: int = None):
+        """Drop every entry (or only entries older than `version`)."""
+        with self._lock:
+            if version is None:
+                self.evictions += len(self._entries)
+                self._entries.clear()
+                return
+            self._drop_older(version)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions, "version": self._version}
+
+    # ---------- internals ----------
+    def _get(self, key, count_miss: bool = True):
+        now = time.monotonic()
+        with self._lock:
+            self._observe_version(key[0])
+            entry = self._entries.get(key)
+            if entry is None or now - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    del self._entries[key]
+                    self.evictions += 1
+                self.misses += count_miss
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def _put(self, key, value):
+        with self._lock:
+            if self._version is not None and key[0] < self._version:
+                return                       # computed from data that has since changed
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _observe_version(self, version):
+        if self._version is None or version > self._version:
+            self._version = version
+            self._drop_older(version)
+
+    def _drop_older(self, version):
+        stale = [k for k in self._entries if k[0] < version]
+        for k in stale:
+            del self._entries[k]
+        self.evictions += len(stale)
@@ -0,0 +1,465 @@
+# jjm_engine.py
+# Computation core for the JJM dashboards: plain pandas / NumPy, no Streamlit imports.
+
+import numpy as np
+import pandas as pd
+
+from jjm_store import READING_COLUMNS, SCHEME_COLUMNS
+
+WINDOWS = (7, 15, 30)
+SCORE_WEIGHTS = (0.5, 0.5)     # (days updated, water quantity) in every jalmitra score
+
+
+def date_codes(values) -> tuple:
+    """
+    Factorize a date column once: returns (codes, unique dates as datetime64[D]).
+    Window tests then compare the handful of unique dates instead of every row; missing dates get code -1.
+    """
+    codes, uniques = pd.factorize(values)
+    days = pd.to_datetime(pd.Index(uniques), errors="coerce").values.astype("datetime64[D]")
+    return codes, days
+
+
+def text_values(values) -> np.ndarray:
+    """A name column (object or categorical) as an object array of str, "" for missing."""
+    codes, uniques = pd.factorize(values)
+    return np.append(pd.Index(uniques).astype(str).to_numpy(dtype=object), "")[codes]
+
+
+def day_offsets(dates, today) -> np.ndarray:
+    """Days before `today` for every date (0 = today); -1 for missing/unparseable dates."""
+    codes, days = date_codes(dates)
+    offsets = (np.datetime64(today, "D") - days).astype(np.int64)
+    offsets[np.isnat(days)] = -1
+    return np.append(offsets, -1)[codes]
+
+
+def row_so_names(rows: pd.DataFrame, s: pd.DataFrame, pos: np.ndarray) -> np.ndarray:
+    """Each row's so_name as text, falling back to its scheme's (`s` row at `pos`, -1 = unknown) when blank."""
+    scheme_so = np.append(text_values(s["so_name"]), "")[pos]
+    own_so = text_values(rows["so_name"])
+    return np.where(own_so == "", scheme_so, own_so)
+
+
+def precompute_windows(rollup: pd.DataFrame, schemes: pd.DataFrame, jalmitras_map: dict,
+                       today, windows: tuple = WINDOWS, assigned_only: bool = None) -> dict:
+    """
+    Metrics for every window in `windows`, for every jalmitra and SO, from one pass over the daily rollup.
+
+    Rollup rows (so_name, reading_date, jalmitra, scheme_id, water_quantity) are scattered onto a dense
+    (so, jalmitra) x day-offset grid; cumulative sums along the day axis then give each window's
+    days-updated and total water by reading a single column.
+
+    Returns {period: {
+        "jalmitras":           per (so, jalmitra) AEE scores   (compute_jalmitra_metrics_for_period layout),
+        "so_metrics":          per SO AEE aggregate            (compute_jalmitra_metrics_for_period layout),
+        "so_jalmitra_metrics": per (so, jalmitra) SO-page metrics over Functional schemes
+                               (compute_metrics layout plus so_name),
+    }}
+    "jalmitras" holds the jalmitras of `jalmitras_map` when `assigned_only` (default: when the map is
+    non-empty), otherwise every jalmitra with a reading in the window.
+    """
+    n_days = max(windows)
+    offsets = day_offsets(rollup["reading_date"], today)
+    rows = rollup.loc[(offsets >= 0) & (offsets < n_days)]
+    day = offsets[(offsets >= 0) & (offsets < n_days)]
+
+    # scheme attributes by position of each row's scheme_id (-1 = unknown scheme)
+    s = schemes.drop_duplicates(subset=["id"])
+    pos = pd.Index(s["id"]).get_indexer(rows["scheme_id"])
+    functional = np.append((s["functionality"] == "Functional").to_numpy(dtype=bool), False)[pos]
+    row_so = row_so_names(rows, s, pos)
+
+    # (so, jalmitra) pairs: assigned jalmitras first (in map order), then any others seen in readings
+    base = list(dict.fromkeys((so, jm) for so, jms in jalmitras_map.items() for jm in jms))
+    n_base = len(base)
+    if assigned_only is None:
+        assigned_only = n_base > 0
+    keys = pd.MultiIndex.from_arrays([
+        np.concatenate([np.array([so for so, _ in base], dtype=object), row_so]),
+        np.concatenate([np.array([jm for _, jm in base], dtype=object), rows["jalmitra"].to_numpy(dtype=object)]),
+    ])
+    all_codes, pairs = pd.factorize(keys)
+    pair = all_codes[len(base):]
+    n_pairs = len(pairs)
+    pair_so = pairs.get_level_values(0).to_numpy(dtype=object)
+    pair_jm = pairs.get_level_values(1).to_numpy(dtype=object)
+
+    # float32 water (compact schema) is widened and snapped back to the 2 dp the rollup sums are kept at
+    water = pd.to_numeric(rows["water_quantity"], errors="coerce").fillna(0.0).to_numpy(dtype=float).round(2)
+
+    def _cumulative(mask):
+        flat = pair[mask] * n_days + day[mask]
+        w = np.bincount(flat, weights=water[mask], minlength=n_pairs * n_days).reshape(n_pairs, n_days)
+        d = np.bincount(flat, minlength=n_pairs * n_days).reshape(n_pairs, n_days) > 0
+        return w.cumsum(axis=1), d.cumsum(axis=1)
+
+    # all readings -> AEE scores; Functional schemes only -> SO-page metrics
+    cum_water, cum_days = _cumulative(np.ones(len(rows), dtype=bool))
+    cum_water_f, cum_days_f = _cumulative(functional)
+
+    # most recent day each (pair, scheme) was read, for schemes_covered / ideal totals
+    ideal_per_day = pd.to_numeric(s["ideal_per_day"], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    ps_codes, ps_keys = pd.factorize(pair[functional].astype(np.int64) * len(s) + pos[functional])
+    last_seen = np.full(len(ps_keys), n_days, dtype=np.int64)
+    np.minimum.at(last_seen, ps_codes, day[functional])
+    ps_pair = ps_keys // max(len(s), 1)
+    ps_ideal = ideal_per_day[ps_keys % max(len(s), 1)] if len(s) else np.zeros(0)
+
+    out = {}
+    for period in windows:
+        col = period - 1
+        days_updated = cum_days[:, col].astype(int)
+        total_water = cum_water[:, col].round(2)
+
+        # ---- AEE: jalmitra scores normalised by the SO's best total, averaged per SO ----
+        keep = np.arange(n_pairs) < n_base if assigned_only else days_updated > 0
+        grouped = pd.DataFrame({
+            "so_name": pair_so[keep], "jalmitra": pair_jm[keep],
+            "days_updated": days_updated[keep], "total_water": total_water[keep],
+        })
+        so_max = grouped.groupby("so_name")["total_water"].transform("max").replace({0: np.nan})
+        grouped["so_max_total"] = so_max
+        grouped["qty_norm"] = (grouped["total_water"] / so_max).fillna(0.0)
+        grouped["days_norm"] = grouped["days_updated"] / float(period)
+        grouped["jal_score"] = blend_score(grouped["days_norm"], grouped["qty_norm"]).round(4).fillna(0.0)
+        so_metrics = grouped.groupby("so_name").agg(
+            so_score=("jal_score", "mean"),
+            mean_days_updated=("days_updated", "mean"),
+            total_water_so=("total_water", "sum"),
+            n_jalmitras=("jalmitra", "nunique"),
+        ).reset_index()
+        so_metrics["so_score"] = so_metrics["so_score"].fillna(0.0).round(4)
+        so_metrics["mean_days_updated"] = so_metrics["mean_days_updated"].round(2)
+        so_metrics["total_water_so"] = so_metrics["total_water_so"].round(2)
+
+        # ---- SO page: Functional-scheme metrics with ideal-based quantity score ----
+        in_window = last_seen < period
+        covered = np.bincount(ps_pair[in_window], minlength=n_pairs)
+        ideal_total = np.bincount(ps_pair[in_window], weights=ps_ideal[in_window] * float(period),
+                                  minlength=n_pairs).round(2)
+        water_f = cum_water_f[:, col]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            quantity_score = np.where(ideal_total > 0, np.minimum(water_f / ideal_total, 1.0), 0.0).round(3)
+        active = cum_days_f[:, col] > 0
+        so_jm = pd.DataFrame({
+            "so_name": pair_so[active], "jalmitra": pair_jm[active],
+            "days_updated": cum_days_f[active, col].astype(int),
+            "total_water_m3": water_f[active].round(2),
+            "schemes_covered": covered[active].astype(np.int64),
+            "ideal_total_Nd": ideal_total[active],
+            "quantity_score": quantity_score[active],
+        }).sort_values(["so_name", "jalmitra"]).reset_index(drop=True)
+
+        out[period] = {"jalmitras": grouped, "so_metrics": so_metrics, "so_jalmitra_metrics": so_jm}
+    return out
+
+
+def aee_so_summary(so_metrics: pd.DataFrame, schemes: pd.DataFrame, rollup: pd.DataFrame,
+                   today, period: int) -> pd.DataFrame:
+    """
+    AEE summary columns for every SO in `so_metrics`: one grouped aggregation over the schemes,
+    one over the window's rollup rows, then a single join on so_name (no per-SO filtering).
+    """
+    s = schemes.assign(functional_id=schemes["id"].where(schemes["functionality"] == "Functional"))
+    scheme_counts = s.groupby("so_name").agg(
+        total_schemes=("id", "nunique"),
+        functional_schemes=("functional_id", "nunique"),
+    )
+
+    offsets = day_offsets(rollup["reading_date"], today)
+    in_window = (offsets >= 0) & (offsets < period)
+    window = rollup.loc[in_window, ["so_name", "jalmitra", "scheme_id"]]
+    window = window.assign(today_jalmitra=window["jalmitra"].where(offsets[in_window] == 0))
+    read_counts = window.groupby("so_name", observed=True).agg(
+        present_today=("today_jalmitra", "nunique"),
+        schemes_updated=("scheme_id", "nunique"),
+    )
+
+    counts = (so_metrics[["so_name"]].join(scheme_counts, on="so_name").join(read_counts, on="so_name")
+              .drop(columns="so_name").fillna(0).astype(int))
+    summary = so_metrics.copy()
+    summary["Total Schemes"] = counts["total_schemes"].to_numpy()
+    summary["Functional Schemes"] = counts["functional_schemes"].to_numpy()
+    summary["Non-Functional Schemes"] = summary["Total Schemes"] - summary["Functional Schemes"]
+    summary["Present Jalmitra (Today)"] = counts["present_today"].to_numpy()
+    summary[f"Schemes Updated (last {period}d)"] = np.minimum(counts["schemes_updated"], counts["total_schemes"]).to_numpy()
+    summary["Score of SO"] = summary["so_score"]
+    return summary
+
+
+LEVEL_SUMS = ["n_jalmitras", "score_sum", "days_sum", "total_water",
+              "total_schemes", "functional_schemes", "present_today", "schemes_updated"]
+
+
+def hierarchy_levels(jalmitras: pd.DataFrame, so_summary: pd.DataFrame, hierarchy: pd.DataFrame,
+                     period: int, default_aee: str, default_ee: str) -> dict:
+    """
+    Jalmitra -> SO -> AEE -> EE roll-up for one window.
+    Every level is a groupby-sum of the level directly below over additive measures (counts and sums);
+    score and mean days are derived from those sums at each level, so an EE's score is the mean score of
+    all its jalmitras without going back to the readings. SOs missing from `hierarchy` get the defaults.
+    Returns {"so": df, "aee": df, "ee": df}, each sorted by score (best first).
+    """
+    so = jalmitras.groupby("so_name").agg(
+        n_jalmitras=("jalmitra", "size"),
+        score_sum=("jal_score", "sum"),
+        days_sum=("days_updated", "sum"),
+        total_water=("total_water", "sum"),
+    )
+    counts = so_summary.set_index("so_name")[["Total Schemes", "Functional Schemes",
+                                               "Present Jalmitra (Today)", f"Schemes Updated (last {period}d)"]]
+    counts.columns = ["total_schemes", "functional_schemes", "present_today", "schemes_updated"]
+    so = so.join(counts).fillna(0)
+
+    line = hierarchy.drop_duplicates("so_name", keep="last").set_index("so_name")
+    so["aee_name"] = line["aee_name"].reindex(so.index).fillna(default_aee).to_numpy()
+    so["ee_name"] = line["ee_name"].reindex(so.index).fillna(default_ee).to_numpy()
+    so = so.reset_index()
+
+    aee = so.groupby(["ee_name", "aee_name"]).agg(n_sos=("so_name", "size"), **{c: (c, "sum") for c in LEVEL_SUMS})
+    ee = aee.groupby("ee_name").agg(n_aees=("n_sos", "size"), n_sos=("n_sos", "sum"), **{c: (c, "sum") for c in LEVEL_SUMS})
+
+    return {
+        "so": _derive_level(so, period),
+        "aee": _derive_level(aee.reset_index(), period),
+        "ee": _derive_level(ee.reset_index(), period),
+    }
+
+
+def _derive_level(level: pd.DataFrame, period: int) -> pd.DataFrame:
+    n = level["n_jalmitras"].replace(0, np.nan)
+    level["score"] = (level["score_sum"] / n).fillna(0.0).round(4)
+    level["mean_days_updated"] = (level["days_sum"] / n).fillna(0.0).round(2)
+    level["days_updated_pct"] = (100.0 * level["days_sum"] / (n * float(period))).fillna(0.0).round(1)
+    level["total_water"] = level["total_water"].round(2)
+    for c in ["n_jalmitras", "total_schemes", "functional_schemes", "present_today", "schemes_updated"]:
+        level[c] = level[c].astype(int)
+    level["non_functional_schemes"] = level["total_schemes"] - level["functional_schemes"]
+    return level.sort_values(["score", "total_water"], ascending=False).reset_index(drop=True)
+
+
+def window_rankings(rollup: pd.DataFrame, schemes: pd.DataFrame, jalmitras_map: dict, hierarchy: pd.DataFrame,
+                    today, default_aee: str, default_ee: str, windows: tuple = WINDOWS, workers: int = 1) -> dict:
+    """
+    precompute_windows plus, per window, the AEE SO summary ("so_summary") and the SO / AEE / EE
+    roll-up ("levels"). `rollup` should cover at least the last max(windows) days up to `today`.
+    With `workers` > 1 the per-SO metrics are computed in a process pool (jjm_parallel).
+    """
+    if workers > 1:
+        from jjm_parallel import parallel_windows     # process pool mode only; the engine itself stays serial
+        rankings = parallel_windows(rollup, schemes, jalmitras_map, today, windows, workers)
+    else:
+        rankings = precompute_windows(rollup, schemes, jalmitras_map, today, windows)
+    for period, frames in rankings.items():
+        frames["so_summary"] = aee_so_summary(frames["so_metrics"], schemes, rollup, today, period)
+        frames["levels"] = hierarchy_levels(frames["jalmitras"], frames["so_summary"], hierarchy,
+                                            period, default_aee, default_ee)
+    return rankings
+
+
+# ---------- scores and present / absent ----------
+def blend_score(days_norm, quantity_norm):
+    """Jalmitra score from its normalised days updated and water quantity (both in [0, 1])."""
+    return SCORE_WEIGHTS[0] * days_norm + SCORE_WEIGHTS[1] * quantity_norm
+
+
+def rank_jalmitras(metrics: pd.DataFrame, master_jalmitras: list, period: int) -> pd.DataFrame:
+    """
+    SO-page ranking for one window: compute_metrics-layout `metrics` plus a zero row for every master
+    jalmitra without readings, scored with blend_score(days_updated / period, quantity_score) and
+    ordered by score then total water (best first) with a 1-based "Rank".
+    """
+    seen = set(metrics["jalmitra"])
+    missing = [jm for jm in dict.fromkeys(master_jalmitras) if jm not in seen]
+    if missing:
+        zeros = pd.DataFrame({"jalmitra": missing, "days_updated": 0, "total_water_m3": 0.0, "schemes_covered": 0,
+                              "ideal_total_Nd": 0.0, "quantity_score": 0.0})
+        metrics = pd.concat([metrics, zeros], ignore_index=True)
+    else:
+        metrics = metrics.copy()
+    metrics["days_norm"] = metrics["days_updated"] / float(period)
+    metrics["score"] = blend_score(metrics["days_norm"], metrics["quantity_score"])
+    metrics = metrics.sort_values(by=["score", "total_water_m3"], ascending=False).reset_index(drop=True)
+    metrics["Rank"] = metrics.index + 1
+    return metrics
+
+
+def split_ranked(ranked: pd.DataFrame) -> tuple:
+    """(top half best first, bottom half worst first) of a rank_jalmitras frame; an odd row goes to the bottom."""
+    top_count = len(ranked) // 2
+    bottom = ranked.tail(len(ranked) - top_count)
+    bottom = bottom.sort_values(by=["score", "total_water_m3"], ascending=True).reset_index(drop=True)
+    return ranked.head(top_count).copy(), bottom
+
+
+def present_absent(master_jalmitras: list, present) -> tuple:
+    """(sorted present jalmitras, master jalmitras not present in master order) for today's `present` set."""
+    present = present if isinstance(present, (set, frozenset)) else set(present)
+    return sorted(present), [jm for jm in master_jalmitras if jm not in present]
+
+
+# ---------- ranking pages ----------
+def page_rows(df: pd.DataFrame, by: str, ascending: bool = False, page: int = 0, page_size: int = 10) -> pd.DataFrame:
+    """
+    Rows [page * page_size, (page + 1) * page_size) of `df` ordered by `by`, ties kept in frame order.
+    For the first pages of a numeric column only the top (page + 1) * page_size rows are selected and
+    ordered (nlargest / nsmallest) instead of sorting the whole frame.
+    """
+    k = min((page + 1) * page_size, len(df))
+    if k <= page * page_size:
+        return df.iloc[:0]
+    partial = k < len(df) // 2       # deep pages: a full stable sort is as cheap (and nlargest then sorts anyway)
+    if partial and pd.api.types.is_numeric_dtype(df[by]) and not pd.api.types.is_bool_dtype(df[by]):
+        head = df.nsmallest(k, by, keep="first") if ascending else df.nlargest(k, by, keep="first")
+    else:
+        head = df.sort_values(by, ascending=ascending, kind="stable").head(k)
+    return head.iloc[page * page_size:k]
+
+
+# ---------- per-SO window metrics ----------
+EMPTY_METRICS_COLUMNS = ["jalmitra", "days_updated", "total_water_m3", "schemes_covered", "ideal_total_Nd", "quantity_score"]
+
+
+def ensure_columns(df: pd.DataFrame, cols: list) -> pd.DataFrame:
+    """Add any missing `cols` to `df` in place (0 for ids / reading, 0.0 for quantities, "" otherwise)."""
+    if df is None:
+        df = pd.DataFrame(columns=cols)
+    for c in cols:
+        if c not in df.columns:
+            if c in ("id", "scheme_id", "reading"):
+                df[c] = 0
+            elif c in ("water_quantity", "ideal_per_day"):
+                df[c] = 0.0
+            else:
+                df[c] = ""
+    return df
+
+
+def _with_columns(df: pd.DataFrame, cols: list) -> pd.DataFrame:
+    """ensure_columns without mutating the caller's frame (copies only when something is missing)."""
+    if df is None:
+        return ensure_columns(None, cols)
+    if all(c in df.columns for c in cols):
+        return df
+    return ensure_columns(df.copy(), cols)
+
+
+def compute_metrics(readings: pd.DataFrame, schemes: pd.DataFrame, so: str, start: str, end: str):
+    """
+    Compute per-jalmitra metrics for a given SO and date window (uncached; the app caches it per data version).
+    Scheme attributes are looked up by scheme-id position instead of a full merge, and the SO / date
+    filters and per-jalmitra aggregation run on integer codes.
+    Returns (filtered_rows, metrics_df); filtered_rows are the reading rows joined with
+    functionality / ideal_per_day / scheme_label, with unified so_name and "Scheme Display".
+    """
+    r = _with_columns(readings, READING_COLUMNS)
+    s = _with_columns(schemes, SCHEME_COLUMNS).drop_duplicates(subset=["id"])
+
+    # scheme attributes indexed by the position of each reading's scheme_id (-1 = unknown scheme)
+    pos = pd.Index(s["id"]).get_indexer(r["scheme_id"])
+    functional = np.append((s["functionality"] == "Functional").to_numpy(dtype=bool), False)[pos]
+
+    # date window, tested on the unique dates only
+    d_codes, d_uniques = date_codes(r["reading_date"])
+    in_window = (d_uniques >= np.datetime64(start, "D")) & (d_uniques <= np.datetime64(end, "D"))
+    in_window = np.append(in_window, False)[d_codes]
+
+    # so_name, only on the Functional rows inside the window: the reading's own value, falling back to
+    # the scheme's when empty/missing (factorizing a text column is the costly step on object frames)
+    cand = np.flatnonzero(functional & in_window)
+    own = r["so_name"]
+    if len(cand) < len(r):
+        own = own.take(cand)
+    so_codes, so_uniques = pd.factorize(own)
+    so_uniques = pd.Index(so_uniques)
+    own_so = np.append(so_uniques.astype(str) == so, False)[so_codes]
+    own_missing = np.append(so_uniques == "", True)[so_codes]
+    scheme_so = np.append((s["so_name"].fillna("").astype(str) == so).to_numpy(dtype=bool), so == "")[pos[cand]]
+    idx = cand[np.where(own_missing, scheme_so, own_so)]
+
+    if not len(idx):
+        # return an empty metrics DataFrame with expected columns so callers don't blow up
+        return _joined_rows(r.iloc[:0], s, pos[:0], so), pd.DataFrame(columns=EMPTY_METRICS_COLUMNS)
+    if len(idx) == len(r):
+        idx = None
+        lastN = _joined_rows(r, s, pos, so)
+    else:
+        lastN = _joined_rows(r.iloc[idx], s, pos[idx], so)
+
+    # compute days_count safely
+    try:
+        days_count = (pd.to_datetime(end) - pd.to_datetime(start)).days + 1
+        if days_count <= 0:
+            days_count = 1
+    except Exception:
+        days_count = 7
+
+    # aggregate per jalmitra on integer codes; rows without a jalmitra are dropped like groupby does
+    jm_codes, jm_names = pd.factorize(lastN["jalmitra"], sort=True)
+    keep = jm_codes >= 0
+    jm_codes = jm_codes[keep]
+    n_jm = len(jm_names)
+    day = (d_codes if idx is None else d_codes[idx])[keep].astype(np.int64)
+    spos = (pos if idx is None else pos[idx])[keep].astype(np.int64)
+    water = lastN["water_quantity"].to_numpy()[keep]
+
+    # nunique as counts of distinct (jalmitra, day) and (jalmitra, scheme) pairs
+    day_rows = _first_rows(jm_codes * len(d_uniques) + day, n_jm * len(d_uniques))
+    days_updated = np.bincount(jm_codes[day_rows], minlength=n_jm)
+    first_row = _first_rows(jm_codes * len(s) + spos, n_jm * len(s))
+    schemes_covered = np.bincount(jm_codes[first_row], minlength=n_jm)
+
+    # ideal contribution of each unique (jalmitra, scheme) pair across the window, summed in row order
+    ideal = lastN["ideal_per_day"].to_numpy()[keep][first_row] * float(days_count)
+    ideal_total = pd.Series(ideal).groupby(jm_codes[first_row]).sum().reindex(range(n_jm), fill_value=0.0)
+
+    metrics = pd.DataFrame({
+        "jalmitra": jm_names,
+        "days_updated": days_updated.astype(int),
+        "total_water_m3": pd.Series(water).groupby(jm_codes).sum().reindex(range(n_jm), fill_value=0.0).to_numpy(),
+        "schemes_covered": schemes_covered.astype(np.int64),
+        "ideal_total_Nd": ideal_total.to_numpy().round(2),
+    })
+
+    # quantity score = min(total_water / ideal_total_Nd, 1.0) (0 if ideal_total_Nd <= 0)
+    ideal_arr = metrics["ideal_total_Nd"].to_numpy()
+    water_arr = metrics["total_water_m3"].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        metrics["quantity_score"] = np.where(ideal_arr > 0, np.minimum(water_arr / ideal_arr, 1.0), 0.0).round(3)
+    metrics["total_water_m3"] = metrics["total_water_m3"].round(2)
+    metrics.attrs["days_count"] = days_count
+
+    return lastN, metrics
+
+
+def _first_rows(keys: np.ndarray, n_keys: int) -> np.ndarray:
+    """Ascending row numbers of the first occurrence of each distinct key in [0, n_keys)."""
+    if n_keys <= 1 << 24:
+        first = np.full(n_keys, len(keys), dtype=np.int64)
+        np.minimum.at(first, keys, np.arange(len(keys), dtype=np.int64))
+        first = first[first < len(keys)]
+    else:
+        first = np.unique(keys, return_index=True)[1]
+    first.sort()
+    return first
+
+
+def _joined_rows(rows: pd.DataFrame, s: pd.DataFrame, spos: np.ndarray, so: str) -> pd.DataFrame:
+    """Reading rows plus the scheme attributes at positions `spos` (all rows already matched `so` and Functional)."""
+    out = rows.copy(deep=False)
+    out["so_name"] = so
+    out["functionality"] = "Functional"
+    out["ideal_per_day"] = pd.to_numeric(s["ideal_per_day"], errors="coerce").fillna(0.0).to_numpy()[spos]
+    out["scheme_label"] = s["scheme_label"].to_numpy()[spos]
+    # display name: the reading's scheme_name, else the scheme's, else ""
+    own_missing = out["scheme_name"].isna().to_numpy()
+    if own_missing.any():
+        display = out["scheme_name"].to_numpy(dtype=object, copy=True)
+        fallback = s["scheme_name"].to_numpy(dtype=object)[spos[own_missing]]
+        display[own_missing] = np.where(pd.isna(fallback), "", fallback)    # only the filled-in names can be missing
+        out["Scheme Display"] = display
+    else:
+        out["Scheme Display"] = out["scheme_name"]
+    out["water_quantity"] = pd.to_numeric(out["water_quantity"], errors="coerce").fillna(0.0).round(2)
+    return out
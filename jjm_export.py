@@ -0,0 +1,93 @@
+# jjm_export.py
+# On-demand snapshot exports (gzip CSV or Parquet) of schemes and readings, optionally for one SO and
+# an inclusive date range. Rows are written chunk by chunk, so memory stays bounded by the chunk size.
+# Run from the repo root:  python jjm_export.py out_dir [--format parquet] [--so NAME] [--start ISO] [--end ISO]
+
+import argparse
+import csv
+import gzip
+import os
+import re
+import time
+
+from jjm_store import READING_COLUMNS, SCHEME_COLUMNS, ReadingsStore
+
+DEFAULT_CHUNKSIZE = 100_000
+FORMATS = {"csv.gz": ".csv.gz", "parquet": ".parquet"}
+
+# storage-form column types, so every Parquet chunk (and an empty export) shares one schema
+_ARROW_TYPES = {"id": "int64", "scheme_id": "int64", "reading": "int64", "water_quantity": "float64",
+                "ideal_per_day": "float64"}
+
+
+def export_name(kind: str, fmt: str, so: str = None, start: str = None, end: str = None) -> str:
+    """File name for an export, e.g. readings_SO-Name_2024-01-01_2024-01-31.csv.gz."""
+    parts = [kind]
+    if so:
+        parts.append(re.sub(r"[^0-9A-Za-z]+", "-", so).strip("-"))
+    if start or end:
+        parts.append(f"{start or 'start'}_{end or 'end'}")
+    return "_".join(parts) + FORMATS[fmt]
+
+
+def write_chunks(chunks, path: str, columns: list, fmt: str = "csv.gz") -> int:
+    """Write an iterable of DataFrames to one gzip CSV / Parquet file; returns the number of rows."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt} (expected one of {', '.join(FORMATS)})")
+    rows = 0
+    if fmt == "csv.gz":
+        with gzip.open(path, "wt", encoding="utf-8", newline="", compresslevel=6) as fh:
+            csv.writer(fh).writerow(columns)
+            for chunk in chunks:
+                chunk[columns].to_csv(fh, header=False, index=False)
+                rows += len(chunk)
+        return rows
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise ImportError("Parquet export needs pyarrow (pip install pyarrow)") from exc
+    schema = pa.schema([(c, pa.type_for_alias(_ARROW_TYPES.get(c, "string"))) for c in columns])
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pandas(chunk[columns], schema=schema, preserve_index=False))
+            rows += len(chunk)
+    return rows
+
+
+def export_snapshot(store: ReadingsStore, out_dir: str, fmt: str = "csv.gz", so: str = None,
+                    start: str = None, end: str = None, chunksize: int = DEFAULT_CHUNKSIZE) -> dict:
+    """
+    Write schemes and readings (filtered by `so` and the inclusive ISO window) into `out_dir`.
+    Returns {"schemes": path, "readings": path, "rows": readings written, "bytes": total size, "seconds"}.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    t0 = time.perf_counter()
+    schemes_path = os.path.join(out_dir, export_name("schemes", fmt, so))
+    readings_path = os.path.join(out_dir, export_name("readings", fmt, so, start, end))
+    write_chunks([store.schemes(so=so)], schemes_path, SCHEME_COLUMNS, fmt)
+    rows = write_chunks(store.iter_readings(so, start, end, chunksize), readings_path, READING_COLUMNS, fmt)
+    return {"schemes": schemes_path, "readings": readings_path, "rows": rows,
+            "bytes": os.path.getsize(schemes_path) + os.path.getsize(readings_path),
+            "seconds": round(time.perf_counter() - t0, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a JJM snapshot (schemes + readings) as gzip CSV or Parquet.")
+    parser.add_argument("out_dir")
+    parser.add_argument("--format", choices=list(FORMATS), default="csv.gz")
+    parser.add_argument("--so", default=None, help="only this Section Officer")
+    parser.add_argument("--start", default=None, help="first reading date (ISO, inclusive)")
+    parser.add_argument("--end", default=None, help="last reading date (ISO, inclusive)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--db", default=None, help="SQLAlchemy URL (default: JJM_DB_URL or local SQLite)")
+    args = parser.parse_args()
+
+    report = export_snapshot(ReadingsStore(args.db, cache_readings=False), args.out_dir, args.format,
+                             args.so, args.start, args.end, args.chunksize)
+    print(f"{report['rows']:,} readings -> {report['readings']} (+ {os.path.basename(report['schemes'])}), "
+          f"{report['bytes'] / 1e6:.1f} MB in {report['seconds']:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# jjm_index.py
+# Per-SO bidirectional jalmitra <-> scheme_id <-> scheme_label <-> ideal_per_day index.
+# Built once per data version from the assignments and schemes; every lookup after that is a dict / set op.
+
+import pandas as pd
+
+
+class JalmitraIndex:
+    """
+    Lookups for one SO:
+      scheme_of[jm] -> scheme_id          jalmitra_of[scheme_id] -> jm
+      label_of[jm]  -> scheme_label       ideal_of[scheme_id]    -> ideal_per_day
+      master        sorted jalmitras whose assigned scheme exists in the SO's schemes
+    """
+
+    __slots__ = ("scheme_of", "jalmitra_of", "label_of", "ideal_of", "master")
+
+    def __init__(self):
+        self.scheme_of, self.jalmitra_of, self.label_of, self.ideal_of = {}, {}, {}, {}
+        self.master = []
+
+    def ideal(self, jalmitra: str) -> float:
+        """Ideal m³/day of the jalmitra's assigned scheme (0.0 when unknown)."""
+        return float(self.ideal_of.get(self.scheme_of.get(jalmitra), 0.0))
+
+    def label(self, jalmitra: str) -> str:
+        return self.label_of.get(jalmitra) or ""
+
+
+def build_so_indexes(assignments: pd.DataFrame, schemes: pd.DataFrame) -> dict:
+    """
+    {so_name: JalmitraIndex} from the assignment rows (so_name, scheme_id, jalmitra, scheme_label) and
+    the schemes (id, so_name, scheme_label, ideal_per_day). Later assignments win, as in store.mappings().
+    """
+    ideal = dict(zip(schemes["id"].astype(int), pd.to_numeric(schemes["ideal_per_day"], errors="coerce").fillna(0.0)))
+    scheme_label = dict(zip(schemes["id"].astype(int), schemes["scheme_label"]))
+    scheme_so = dict(zip(schemes["id"].astype(int), schemes["so_name"]))
+    indexes = {}
+    for so, sid, jm, label in assignments[["so_name", "scheme_id", "jalmitra", "scheme_label"]].itertuples(index=False, name=None):
+        idx = indexes.get(so)
+        if idx is None:
+            idx = indexes[so] = JalmitraIndex()
+        sid = int(sid)
+        idx.jalmitra_of[sid] = jm
+        idx.scheme_of[jm] = sid
+        idx.label_of[jm] = label or scheme_label.get(sid) or ""
+        if sid in ideal:
+            idx.ideal_of[sid] = float(ideal[sid])
+    for so, idx in indexes.items():
+        idx.master = sorted({jm for sid, jm in idx.jalmitra_of.items() if scheme_so.get(sid) == so})
+    return indexes
@@ -0,0 +1,132 @@
+# jjm_ingest.py
+# Chunked ingest of field BFM readings (CSV or Parquet) into the shared store.
+# Memory stays bounded by the chunk size, so files larger than RAM can be loaded.
+# Run from the repo root:  python jjm_ingest.py readings.csv [more.parquet ...] [--chunksize N]
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from jjm_store import READING_COLUMNS, ReadingsStore, bytes_per_reading, compact_readings
+
+DEFAULT_CHUNKSIZE = 100_000
+
+# same fill values ensure_columns uses for a missing column
+_INT_COLUMNS = ("scheme_id", "reading")
+_FLOAT_COLUMNS = ("water_quantity",)
+_TEXT_COLUMNS = ("jalmitra", "reading_time", "scheme_name", "so_name")
+
+
+def iter_chunks(path: str, chunksize: int = DEFAULT_CHUNKSIZE):
+    """Yield DataFrames of at most `chunksize` rows from a .csv / .csv.gz / .parquet file."""
+    lower = path.lower()
+    if lower.endswith((".parquet", ".pq")):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise ImportError("Parquet ingest needs pyarrow (pip install pyarrow)") from exc
+        pf = pq.ParquetFile(path)
+        wanted = [c for c in READING_COLUMNS if c in pf.schema_arrow.names]
+        for batch in pf.iter_batches(batch_size=chunksize, columns=wanted):
+            yield batch.to_pandas()
+    elif lower.endswith((".csv", ".csv.gz", ".txt")):
+        yield from pd.read_csv(path, chunksize=chunksize, dtype=str, keep_default_na=False,
+                               usecols=lambda c: c in READING_COLUMNS)
+    else:
+        raise ValueError(f"Unsupported file type for ingest: {path} (expected .csv, .csv.gz or .parquet)")
+
+
+def normalize_readings(chunk: pd.DataFrame, schemes: pd.DataFrame, keep_index: bool = False) -> tuple:
+    """
+    Validate one chunk against the readings schema.
+    Missing columns get ensure_columns' defaults; scheme_id must be a known scheme and reading_date a
+    parseable date (stored as ISO text); scheme_name / so_name are filled from the scheme when blank.
+    Returns (clean_rows without ids, number of rejected rows); `keep_index` keeps the chunk's index
+    on the clean rows, so callers can tell which input rows were accepted.
+    """
+    n = len(chunk)
+    out = pd.DataFrame(index=chunk.index)
+    for c in _INT_COLUMNS:
+        out[c] = pd.to_numeric(chunk[c], errors="coerce") if c in chunk.columns else 0
+    for c in _FLOAT_COLUMNS:
+        out[c] = (pd.to_numeric(chunk[c], errors="coerce").fillna(0.0).astype(float)
+                  if c in chunk.columns else 0.0)
+    for c in _TEXT_COLUMNS:
+        out[c] = chunk[c].fillna("").astype(str).str.strip() if c in chunk.columns else ""
+    # dates repeat heavily: parse each distinct value once, then broadcast the ISO text by code
+    codes, uniques = pd.factorize(chunk["reading_date"] if "reading_date" in chunk.columns
+                                  else pd.Series("", index=chunk.index))
+    parsed = pd.to_datetime(pd.Index(uniques).astype(str), errors="coerce", format="mixed")
+    iso = np.append(parsed.strftime("%Y-%m-%d").to_numpy(dtype=object), None)
+    out["reading_date"] = iso[codes]
+
+    # scheme attributes by position of each row's scheme_id (-1 = unknown scheme -> rejected)
+    pos = pd.Index(schemes["id"]).get_indexer(out["scheme_id"].fillna(-1).astype(np.int64))
+    valid = (pos >= 0) & pd.notna(out["reading_date"]).to_numpy() & (out["jalmitra"] != "").to_numpy()
+    out, pos = out.loc[valid], pos[valid]
+    for c in ("scheme_name", "so_name"):
+        known = schemes[c].fillna("").astype(str).to_numpy(dtype=object)[pos]
+        out[c] = np.where(out[c].to_numpy(dtype=object) == "", known, out[c].to_numpy(dtype=object))
+    out["scheme_id"] = out["scheme_id"].astype(np.int64)
+    out["reading"] = out["reading"].fillna(0).astype(np.int64)
+    return out if keep_index else out.reset_index(drop=True), n - int(valid.sum())
+
+
+def ingest_file(store: ReadingsStore, path: str, chunksize: int = DEFAULT_CHUNKSIZE, progress=None) -> dict:
+    """
+    Stream `path` into `store` chunk by chunk; each chunk is one store.append (and rollup update).
+    Reading ids are reserved from the store per chunk (reserve_ids), so ids in the file are ignored.
+    `progress(report)` is called after every chunk with the running totals.
+    The validated chunks are written in storage form; the report carries their bytes per reading as
+    plain object columns and in the compact in-memory schema.
+    Returns {"file", "chunks", "rows", "rejected", "seconds", "rows_per_sec",
+             "bytes_per_reading_before", "bytes_per_reading_after"}.
+    """
+    schemes = store.schemes(columns=["id", "scheme_name", "so_name"])
+    report = {"file": os.path.basename(path), "chunks": 0, "rows": 0, "rejected": 0,
+              "seconds": 0.0, "rows_per_sec": 0.0, "bytes_per_reading_before": 0.0, "bytes_per_reading_after": 0.0}
+    raw_bytes = compact_bytes = 0.0
+    t0 = time.perf_counter()
+    for chunk in iter_chunks(path, chunksize):
+        clean, rejected = normalize_readings(chunk, schemes)
+        if not clean.empty:
+            _, next_rid = store.reserve_ids(readings=len(clean))
+            clean.insert(0, "id", np.arange(next_rid, next_rid + len(clean), dtype=np.int64))
+            compact = compact_readings(clean[READING_COLUMNS])
+            raw_bytes += bytes_per_reading(clean) * len(clean)
+            compact_bytes += bytes_per_reading(compact) * len(clean)
+            store.append(readings=clean[READING_COLUMNS])
+        report["chunks"] += 1
+        report["rows"] += len(clean)
+        report["rejected"] += rejected
+        report["seconds"] = round(time.perf_counter() - t0, 3)
+        report["rows_per_sec"] = round(report["rows"] / max(report["seconds"], 1e-9), 1)
+        report["bytes_per_reading_before"] = round(raw_bytes / max(report["rows"], 1), 1)
+        report["bytes_per_reading_after"] = round(compact_bytes / max(report["rows"], 1), 1)
+        if progress is not None:
+            progress(dict(report))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load BFM readings (CSV / Parquet) into the JJM store.")
+    parser.add_argument("paths", nargs="+", help="CSV, CSV.gz or Parquet files with readings columns")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--db", default=None, help="SQLAlchemy URL (default: JJM_DB_URL or local SQLite)")
+    args = parser.parse_args()
+
+    store = ReadingsStore(args.db)
+    for path in args.paths:
+        report = ingest_file(store, path, args.chunksize,
+                             progress=lambda r: print(f"  {r['file']}: {r['rows']:,} rows "
+                                                      f"({r['rows_per_sec']:,.0f} rows/s)", end="\r"))
+        print(f"{report['file']}: {report['rows']:,} rows in {report['chunks']} chunks, "
+              f"{report['rejected']:,} rejected, {report['seconds']:.1f} s, {report['rows_per_sec']:,.0f} rows/s, "
+              f"{report['bytes_per_reading_before']:.0f} -> {report['bytes_per_reading_after']:.0f} bytes/reading in memory")
+
+
+if __name__ == "__main__":
+    main()
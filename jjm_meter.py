@@ -0,0 +1,149 @@
+# jjm_meter.py
+# Cumulative bulk-flow-meter checks: per scheme, readings are ordered by date / time and each meter value
+# is differenced against the previous one (rollovers of the register unwrapped), gaps in days counted,
+# and the derived volume compared with the reported water_quantity. All vectorized over the batch; the
+# last reading per scheme is carried over, so new batches are checked without revisiting history.
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from jjm_blocks import ReadingBlocks
+from jjm_store import READING_DTYPES, compact_frame
+
+METER_MODULUS = 1_000_000     # 6-digit register: wraps to 0 after 999999
+METER_UNIT_M3 = 0.001         # one meter count = 1 litre
+ROLLOVER_BAND = 0.1           # a drop from the top 10% of the register into the bottom 10% is a rollover
+TOLERANCE_M3 = 0.5            # |meter delta - reported| above max(TOLERANCE_M3, TOLERANCE_REL * reported)
+TOLERANCE_REL = 0.05          #   is a mismatch
+
+FLAGS = ["first", "ok", "mismatch", "gap", "backwards", "late"]
+FIRST, OK, MISMATCH, GAP, BACKWARDS, LATE = range(len(FLAGS))
+
+INPUT_COLUMNS = ["id", "scheme_id", "reading", "reading_date", "reading_time", "water_quantity"]
+DELTA_COLUMNS = ["id", "scheme_id", "so_name", "reading_date", "reading_time", "prev_reading", "reading",
+                 "delta_m3", "water_quantity", "diff_m3", "gap_days", "rollover", "flag"]
+STATE_COLUMNS = ["scheme_id", "day", "minute", "id", "reading"]
+# compact_frame casts only the ordering keys; meter values stay int64 as read, whatever the register size
+KEY_DTYPES = {c: READING_DTYPES[c] for c in ("id", "scheme_id", "reading_date", "reading_time")}
+
+
+def meter_deltas(readings: pd.DataFrame, last: pd.DataFrame = None, modulus: int = METER_MODULUS,
+                 unit_m3: float = METER_UNIT_M3) -> tuple:
+    """
+    Meter checks for a batch of readings (storage form or compact; so_name is carried if present).
+    `last` is the state returned for the previous batch (the latest reading per scheme), so the first
+    reading of a scheme in this batch is differenced against it; None starts every scheme fresh.
+
+    Per reading (DELTA_COLUMNS, in the batch's row order):
+      prev_reading / delta_m3   previous meter value of the scheme and the volume since (rollover unwrapped)
+      diff_m3                   delta_m3 - water_quantity
+      gap_days                  whole days without a reading before this one
+      rollover                  the register wrapped between the two readings
+      flag                      first | ok | mismatch | gap (delta spans missing days, not compared)
+                                | backwards (meter went down without wrapping)
+                                | late (older than the scheme's carried-over reading; not chained)
+    Returns (deltas, new state).
+    """
+    r = compact_frame(readings[[c for c in INPUT_COLUMNS if c in readings.columns]], KEY_DTYPES)
+    n = len(r)
+    sid = r["scheme_id"].to_numpy(dtype=np.int64)
+    dates = r["reading_date"].to_numpy(dtype="datetime64[D]")
+    day = np.where(np.isnat(dates), 0, dates.astype(np.int64))     # undated rows sort first (1970)
+    minute = r["reading_time"].to_numpy(dtype=np.int64) if "reading_time" in r.columns else np.full(n, -1)
+    rid = r["id"].to_numpy(dtype=np.int64)
+    meter = pd.to_numeric(r["reading"], errors="coerce").fillna(0).to_numpy(dtype=np.int64)   # as read, never narrowed
+    batch_meter = meter
+    if last is not None and len(last):
+        sid, day, minute, rid, meter = (np.concatenate([last[c].to_numpy(dtype=np.int64), a])
+                                        for c, a in zip(STATE_COLUMNS, (sid, day, minute, rid, meter)))
+    seed = np.arange(len(sid)) < len(sid) - n           # carried-over rows come first
+
+    # order by scheme, day, minute, id: two lexsort keys instead of four
+    g_codes, _ = pd.factorize(sid)
+    d0 = day.min() if len(day) else 0
+    key = (g_codes.astype(np.int64) * (day.max() - d0 + 1 if len(day) else 1) + (day - d0)) * 1441 + (minute + 1)
+    order = np.lexsort((rid, key))
+    s_sid, s_day, s_meter, s_seed = sid[order], day[order], meter[order], seed[order]
+
+    same = np.zeros(len(order), dtype=bool)
+    same[1:] = s_sid[1:] == s_sid[:-1]
+    group = np.cumsum(~same) - 1
+    # rows sorted before their scheme's carried-over reading arrived late: not chained
+    seed_pos = np.full(group[-1] + 1 if len(group) else 0, -1, dtype=np.int64)
+    seed_pos[group[s_seed]] = np.flatnonzero(s_seed)
+    late = np.arange(len(order)) < seed_pos[group]
+    chained = same & ~late
+
+    prev_meter = np.empty_like(s_meter)
+    prev_meter[0:1] = 0
+    prev_meter[1:] = s_meter[:-1]
+    prev_day = np.empty_like(s_day)
+    prev_day[0:1] = 0
+    prev_day[1:] = s_day[:-1]
+    raw = s_meter - prev_meter
+    rollover = chained & (raw < 0) & (prev_meter >= modulus * (1 - ROLLOVER_BAND)) & (s_meter < modulus * ROLLOVER_BAND)
+    delta = np.where(rollover, raw + modulus, raw)
+    gap_days = np.where(chained, np.maximum(s_day - prev_day - 1, 0), 0)
+
+    # back to the batch's row order (carried-over rows dropped)
+    inv = np.empty(len(order), dtype=np.int64)
+    inv[order] = np.arange(len(order))
+    pos = inv[~seed] if len(seed) else inv
+    water = pd.to_numeric(r["water_quantity"], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+    chained_b, delta_b, late_b = chained[pos], delta[pos], late[pos]
+    delta_m3 = np.where(chained_b, delta_b * unit_m3, np.nan)
+    diff = delta_m3 - water
+    tol = np.maximum(TOLERANCE_M3, TOLERANCE_REL * np.abs(water))
+    flag = np.select([late_b, ~chained_b, delta_b < 0, gap_days[pos] > 0, np.abs(diff) > tol],
+                     [LATE, FIRST, BACKWARDS, GAP, MISMATCH], OK)
+    out = pd.DataFrame({
+        "id": r["id"].to_numpy(), "scheme_id": r["scheme_id"].to_numpy(),
+        "so_name": readings["so_name"].to_numpy() if "so_name" in readings.columns else None,
+        "reading_date": r["reading_date"].to_numpy(),
+        "reading_time": r["reading_time"].to_numpy() if "reading_time" in r.columns else np.full(n, -1, np.int16),
+        "prev_reading": np.where(chained_b, prev_meter[pos], -1),
+        "reading": batch_meter, "delta_m3": delta_m3.astype(np.float32),
+        "water_quantity": water.astype(np.float32), "diff_m3": diff.astype(np.float32),
+        "gap_days": gap_days[pos].astype(np.int16), "rollover": rollover[pos],
+        "flag": pd.Categorical.from_codes(flag.astype(np.int8), FLAGS),
+    })
+    out["so_name"] = out["so_name"].astype("category")
+
+    # new state: the last chained / carried-over row of every scheme
+    ends = np.flatnonzero(np.r_[~same[1:], True]) if len(order) else np.array([], dtype=np.int64)
+    state = pd.DataFrame({c: a[order][ends] for c, a in zip(STATE_COLUMNS, (sid, day, minute, rid, meter))})
+    return out, state
+
+
+class MeterTracker:
+    """
+    Meter checks kept up to date as readings arrive.
+      observe(block)             check a new batch against the carried-over state; O(batch)
+      deltas(so, start, end)     checked rows for an SO / inclusive ISO window (compact, DELTA_COLUMNS)
+    Rows are expected roughly in time order per scheme; a reading older than its scheme's latest is
+    flagged "late" rather than re-chaining history (reset() and re-observe to rebuild).
+    """
+
+    def __init__(self, modulus: int = METER_MODULUS, unit_m3: float = METER_UNIT_M3):
+        self.modulus, self.unit_m3 = modulus, unit_m3
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._state = None
+            self._blocks = ReadingBlocks()
+
+    def observe(self, block: pd.DataFrame) -> pd.DataFrame:
+        if block is None or block.empty:
+            return None
+        with self._lock:
+            deltas, self._state = meter_deltas(block, self._state, self.modulus, self.unit_m3)
+            self._blocks.append(deltas)
+        return deltas
+
+    def deltas(self, so: str = None, start: str = None, end: str = None) -> pd.DataFrame:
+        view = self._blocks.view(so, start, end)
+        return view if view is not None else pd.DataFrame(columns=DELTA_COLUMNS)
@@ -0,0 +1,167 @@
+# jjm_parallel.py
+# Parallel mode for the all-SO window metrics: the window's rollup rows are split into contiguous SO shards,
+# copied once into shared memory (text / categorical columns as int32 codes), and a process pool runs
+# precompute_windows on each shard. Workers attach to the buffers by name, so only the small label lists,
+# schemes and per-SO results cross process boundaries. Set JJM_WORKERS to enable it in the dashboards.
+
+import atexit
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from jjm_engine import WINDOWS, day_offsets, precompute_windows, row_so_names
+
+WORKERS = int(os.environ.get("JJM_WORKERS") or 1)     # 1 = serial
+MIN_ROWS_PER_WORKER = 50_000                          # below this a shard costs more to ship than to compute
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def get_pool(workers: int) -> ProcessPoolExecutor:
+    """The shared process pool (forkserver workers with the engine preloaded), resized on demand."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            ctx = mp.get_context("forkserver")
+            ctx.set_forkserver_preload(["jjm_engine"])
+            _pool, _pool_workers = ProcessPoolExecutor(workers, mp_context=ctx), workers
+        return _pool
+
+
+@atexit.register
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+class SharedFrame:
+    """
+    The columns of a frame, reordered by `order`, copied into one shared-memory block each.
+    `spec` maps column -> (block name, dtype, labels or None); workers rebuild row ranges with attach().
+    Use as a context manager: the blocks are unlinked on exit.
+    """
+
+    def __init__(self, df: pd.DataFrame, order: np.ndarray):
+        self.n, self.spec, self._blocks = len(order), {}, []
+        try:
+            for c in df.columns:
+                col, labels = df[c], None
+                if isinstance(col.dtype, pd.CategoricalDtype) or col.dtype == object:
+                    codes, uniques = pd.factorize(col)
+                    values, labels = codes.astype(np.int32), list(uniques)
+                else:
+                    values = col.to_numpy()
+                shm = shared_memory.SharedMemory(create=True, size=max(values.itemsize * self.n, 1))
+                self._blocks.append(shm)
+                np.take(values, order, out=np.ndarray(self.n, values.dtype, buffer=shm.buf))
+                self.spec[c] = (shm.name, values.dtype.str, labels)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        for shm in self._blocks:
+            shm.close()
+            shm.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach(spec: dict, n: int, lo: int, hi: int) -> pd.DataFrame:
+    """Rows [lo, hi) of a SharedFrame as a private frame (the shared blocks are released before returning)."""
+    cols = {}
+    for c, (name, dtype, labels) in spec.items():
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            values = np.ndarray(n, np.dtype(dtype), buffer=shm.buf)[lo:hi].copy()
+        finally:
+            shm.close()
+        cols[c] = pd.Categorical.from_codes(values, labels) if labels is not None else values
+    return pd.DataFrame(cols)
+
+
+def _shard_windows(spec, n, lo, hi, schemes, jalmitras_map, today, windows, assigned_only):
+    return precompute_windows(attach(spec, n, lo, hi), schemes, jalmitras_map, today, windows, assigned_only)
+
+
+def shard_sos(row_so: np.ndarray, jalmitras_map: dict, shards: int) -> list:
+    """
+    SOs (mapped ones in map order, then the others as first seen) cut into `shards` contiguous groups of
+    roughly equal row counts. Contiguous groups keep each shard's assigned jalmitras in map order.
+    """
+    codes, uniques = pd.factorize(row_so)
+    rows = dict(zip(uniques, np.bincount(codes, minlength=len(uniques))))
+    sos = list(dict.fromkeys([*jalmitras_map, *uniques]))
+    weights = np.array([rows.get(so, 0) + 1 for so in sos], dtype=np.int64)
+    cuts = np.searchsorted(np.cumsum(weights), weights.sum() * np.arange(1, shards) / shards, side="right")
+    return [group for group in np.split(np.array(sos, dtype=object), cuts) if len(group)]
+
+
+def parallel_windows(rollup: pd.DataFrame, schemes: pd.DataFrame, jalmitras_map: dict, today,
+                     windows: tuple = WINDOWS, workers: int = None) -> dict:
+    """
+    precompute_windows computed per SO shard in the process pool and merged; the same frames as the
+    serial call. Runs serially for one worker, for fewer than MIN_ROWS_PER_WORKER rows per worker,
+    or when the pool cannot start.
+    """
+    offsets = day_offsets(rollup["reading_date"], today)
+    rows = rollup.loc[(offsets >= 0) & (offsets < max(windows))]
+    workers = min(workers or WORKERS, len(rows) // MIN_ROWS_PER_WORKER)
+    if workers <= 1:
+        return precompute_windows(rollup, schemes, jalmitras_map, today, windows)
+
+    s = schemes.drop_duplicates(subset=["id"])
+    row_so = row_so_names(rows, s, pd.Index(s["id"]).get_indexer(rows["scheme_id"]))
+    shards = shard_sos(row_so, jalmitras_map, workers)
+    shard_of = {so: i for i, group in enumerate(shards) for so in group}
+    so_codes, so_uniques = pd.factorize(row_so)
+    row_shard = np.array([shard_of[so] for so in so_uniques], dtype=np.int64)[so_codes]
+    order = np.argsort(row_shard, kind="stable")
+    bounds = np.searchsorted(row_shard[order], np.arange(len(shards) + 1))
+    assigned_only = any(len(jms) for jms in jalmitras_map.values())
+
+    try:
+        with SharedFrame(rows, order) as shared:
+            pool = get_pool(workers)
+            futures = [pool.submit(_shard_windows, shared.spec, shared.n, int(bounds[i]), int(bounds[i + 1]),
+                                   s, {so: jalmitras_map[so] for so in group if so in jalmitras_map},
+                                   today, windows, assigned_only)
+                       for i, group in enumerate(shards)]
+            parts = [f.result() for f in futures]
+    except (OSError, BrokenProcessPool):
+        shutdown_pool()
+        return precompute_windows(rollup, schemes, jalmitras_map, today, windows)
+    return merge_windows(parts, windows)
+
+
+def merge_windows(parts: list, windows: tuple = WINDOWS) -> dict:
+    """Concatenate per-shard precompute_windows results, restoring the serial row order."""
+    out = {}
+    for period in windows:
+        frames = [p[period] for p in parts]
+        out[period] = {
+            "jalmitras": pd.concat([f["jalmitras"] for f in frames], ignore_index=True),
+            "so_metrics": pd.concat([f["so_metrics"] for f in frames], ignore_index=True)
+                            .sort_values("so_name", kind="stable").reset_index(drop=True),
+            "so_jalmitra_metrics": pd.concat([f["so_jalmitra_metrics"] for f in frames], ignore_index=True)
+                                     .sort_values(["so_name", "jalmitra"], kind="stable").reset_index(drop=True),
+        }
+    return out
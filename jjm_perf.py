@@ -0,0 +1,145 @@
+# jjm_perf.py
+# Lightweight timing instrumentation: per-section wall time, rows processed and memory deltas for one
+# dashboard run, plus a JSON-lines log. No Streamlit imports; the app renders the records itself.
+
+import datetime
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+PERF_LOG = os.environ.get("JJM_PERF_LOG")     # append one JSON line per instrumented run when set
+
+_local = threading.local()                      # Streamlit runs each session's script in its own thread
+
+
+def _rss_bytes():
+    """Current resident set size of the process (Linux /proc), or None where unavailable."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class Section:
+    """One timed section; set `rows` inside the block to report throughput."""
+
+    __slots__ = ("name", "depth", "seconds", "rows", "mem_delta")
+
+    def __init__(self, name: str, depth: int, rows: int = None):
+        self.name, self.depth, self.rows = name, depth, rows
+        self.seconds, self.mem_delta = 0.0, None
+
+    def as_dict(self) -> dict:
+        return {"section": self.name, "depth": self.depth, "seconds": round(self.seconds, 6), "rows": self.rows,
+                "rows_per_sec": round(self.rows / self.seconds, 1) if self.rows and self.seconds > 0 else None,
+                "mem_delta_mb": round(self.mem_delta / 2**20, 3) if self.mem_delta is not None else None}
+
+
+class _Disabled:
+    """Stand-in yielded by a disabled recorder: accepts `rows` and discards it."""
+
+    __slots__ = ("rows",)
+
+
+class PerfRecorder:
+    """
+    Sections recorded during one run, in start order (nested sections carry their depth).
+      with recorder.section("name", rows=n) as sec: ...   sec.rows may also be set inside the block
+    Memory deltas are process RSS differences, so concurrent sessions show up in each other's numbers.
+    A disabled recorder costs one attribute check per section. `logged` is set once log() has run.
+    """
+
+    def __init__(self, page: str = "", enabled: bool = True):
+        self.page, self.enabled = page, enabled
+        self.sections = []
+        self.logged = False
+        self._depth = 0
+        self._t0 = time.perf_counter()
+
+    @contextmanager
+    def section(self, name: str, rows: int = None):
+        if not self.enabled:
+            yield _Disabled()
+            return
+        sec = Section(name, self._depth, rows)
+        self.sections.append(sec)
+        self._depth += 1
+        mem0, t0 = _rss_bytes(), time.perf_counter()
+        try:
+            yield sec
+        finally:
+            sec.seconds = time.perf_counter() - t0
+            mem1 = _rss_bytes()
+            sec.mem_delta = mem1 - mem0 if mem0 is not None and mem1 is not None else None
+            self._depth -= 1
+
+    def records(self) -> list:
+        return [s.as_dict() for s in self.sections]
+
+    def summary(self) -> dict:
+        """The run as one JSON-serializable dict (what log() writes)."""
+        return {"ts": datetime.datetime.now().isoformat(timespec="seconds"), "page": self.page,
+                "total_seconds": round(time.perf_counter() - self._t0, 6), "sections": self.records()}
+
+    def log(self, path: str = None) -> dict:
+        """Append summary() as one JSON line to `path` (default JJM_PERF_LOG; skipped when neither is set)."""
+        run = self.summary()
+        self.logged = True
+        path = path or PERF_LOG
+        if path and self.enabled:
+            with open(path, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps(run) + "\n")
+        return run
+
+
+def activate(recorder: PerfRecorder) -> PerfRecorder:
+    """Make `recorder` the current thread's recorder (used by section() / timed() without an explicit one)."""
+    _local.recorder = recorder
+    return recorder
+
+
+def current() -> PerfRecorder:
+    recorder = getattr(_local, "recorder", None)
+    if recorder is None:
+        recorder = _local.recorder = PerfRecorder(enabled=False)
+    return recorder
+
+
+def pending() -> PerfRecorder:
+    """
+    The current thread's recorder while its run is still open, else None: no recorder was activated on
+    this thread, or the run was already logged (e.g. a Streamlit fragment rerunning on its own).
+    """
+    recorder = getattr(_local, "recorder", None)
+    return recorder if recorder is not None and not recorder.logged else None
+
+
+def section(name: str, rows: int = None):
+    """Timed section on the current thread's recorder."""
+    return current().section(name, rows)
+
+
+def timed(name: str = None, rows=None):
+    """
+    Decorator form of section(). `rows(result)` may return the number of rows the call produced,
+    e.g. @timed("compute_metrics", rows=len).
+    """
+    def wrap(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with current().section(label) as sec:
+                result = fn(*args, **kwargs)
+                if rows is not None:
+                    try:
+                        sec.rows = rows(result)
+                    except (TypeError, KeyError, AttributeError):
+                        pass
+                return result
+        return inner
+    return wrap
@@ -0,0 +1,323 @@
+# jjm_service.py
+# Local asyncio ingest service for jalmitra BFM reading submissions.
+# Submissions are queued, grouped into micro-batches (up to MAX_BATCH rows or MAX_DELAY seconds) and each
+# batch is one store.append, so a morning burst becomes a few bulk writes instead of one write per reading.
+# Every reading carries an idempotency key (the client's "idempotency_key", else jalmitra|scheme|date|time|
+# reading); keys are committed with the rows, so a retried submission is answered "duplicate".
+# Reading ids are reserved from the store per append (ReadingsStore.reserve_ids), so the service can share
+# the database with dashboard sessions; a failed append is retried in halves, so a conflicting reading fails
+# alone instead of failing its whole micro-batch.
+# When more than MAX_PENDING readings are waiting, new requests get 429 with Retry-After (backpressure).
+# Run from the repo root:  python jjm_service.py [--host 127.0.0.1] [--port 8765] [--db URL]
+#   POST /readings   JSON object, list, or {"readings": [...]}  ->  {"results": [{"status", "id"}, ...]}
+#   GET  /stats      counters (batches, rows, duplicates, queue depth, commit time)
+#   GET  /health
+
+import argparse
+import asyncio
+import collections
+import datetime
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from jjm_ingest import normalize_readings
+from jjm_store import READING_COLUMNS, ReadingsStore
+
+MAX_BATCH = 2_000          # readings per store.append
+MAX_DELAY = 0.05           # seconds a batch waits to fill once its first reading arrived
+MAX_PENDING = 20_000       # queued readings before requests are refused
+MAX_BODY = 1 << 20         # bytes per request body
+RECENT_KEYS = 200_000      # idempotency keys remembered in memory (older ones are checked in the store)
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+            429: "Too Many Requests", 500: "Internal Server Error"}
+
+
+class Overloaded(Exception):
+    """More readings are pending than the service accepts; retry after a short wait."""
+
+
+def idempotency_key(item: dict) -> str:
+    key = item.get("idempotency_key")
+    if key:
+        return str(key)
+    return "|".join(str(item.get(c, "")) for c in ("jalmitra", "scheme_id", "reading_date", "reading_time", "reading"))
+
+
+class IngestService:
+    """
+    Buffers submissions and commits them in micro-batches from a single writer task.
+      await submit(items)   one result per item once its batch is committed:
+                            {"status": "accepted", "id": n} | {"status": "duplicate", "id": n} | {"status": "rejected"}
+    Raises Overloaded when accepting `items` would exceed `max_pending` queued readings; an item whose
+    reading could not be committed even on its own raises that error.
+    Commits run in a worker thread, so the event loop keeps accepting (and batching) during a write.
+    """
+
+    def __init__(self, store: ReadingsStore, max_batch: int = MAX_BATCH, max_delay: float = MAX_DELAY,
+                 max_pending: int = MAX_PENDING):
+        self.store = store
+        self.max_batch, self.max_delay, self.max_pending = max_batch, max_delay, max_pending
+        self.stats = {"requests": 0, "received": 0, "accepted": 0, "duplicates": 0, "rejected": 0, "failed": 0,
+                      "refused": 0, "batches": 0, "retries": 0, "commit_seconds": 0.0, "max_batch_rows": 0}
+        self._queue = None
+        self._pending = 0
+        self._recent = collections.OrderedDict()      # key -> reading_id, most recent last
+        self._schemes, self._schemes_key = None, None
+        self._epoch = None
+        self._writer = None
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._writer = asyncio.create_task(self._write_loop())
+
+    async def stop(self):
+        """Commit what is queued, then stop the writer."""
+        if self._writer is not None:
+            await self._queue.join()
+            self._writer.cancel()
+            self._writer = None
+
+    def snapshot(self) -> dict:
+        s = dict(self.stats)
+        s["pending"] = self._pending
+        s["mean_batch_rows"] = round((s["accepted"] + s["duplicates"] + s["rejected"] + s["failed"])
+                                     / max(s["batches"], 1), 1)
+        s["commit_seconds"] = round(s["commit_seconds"], 3)
+        return s
+
+    async def submit(self, items: list) -> list:
+        self.stats["requests"] += 1
+        if self._pending + len(items) > self.max_pending:
+            self.stats["refused"] += len(items)
+            raise Overloaded()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for item in items:
+            fut = loop.create_future()
+            futures.append(fut)
+            self._queue.put_nowait((item, fut))
+        self._pending += len(items)
+        self.stats["received"] += len(items)
+        return list(await asyncio.gather(*futures))
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+            try:
+                results = await asyncio.to_thread(self._commit, [item for item, _ in batch])
+            except Exception as exc:          # the batch fails as a whole; clients may retry with the same keys
+                results = [exc] * len(batch)
+            for (_, fut), result in zip(batch, results):
+                if not fut.done():
+                    if isinstance(result, Exception):
+                        fut.set_exception(result)
+                    else:
+                        fut.set_result(result)
+            self._pending -= len(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    # ---------- one micro-batch (worker thread) ----------
+    def _commit(self, items: list) -> list:
+        t0 = time.perf_counter()
+        today = datetime.date.today().isoformat()      # readings without a date are today's (also in their key)
+        items = [{**item, "reading_date": item.get("reading_date") or today} if isinstance(item, dict) else item
+                 for item in items]
+        results = [None] * len(items)
+        epoch = self.store.clear_epoch()
+        if epoch != self._epoch:                         # the store was cleared: keys (and schemes) start over
+            self._recent.clear()
+            self._schemes_key, self._epoch = None, epoch
+        keys = [idempotency_key(item) if isinstance(item, dict) else "" for item in items]
+
+        # duplicates: within the batch (first copy wins), recently committed, or already in the store
+        first, repeat_of, fresh = {}, {}, []
+        for i, key in enumerate(keys):
+            if not isinstance(items[i], dict):
+                results[i] = {"status": "rejected"}
+            elif key in first:
+                repeat_of[i] = first[key]
+            else:
+                first[key] = i
+                fresh.append(i)
+        unknown = [keys[i] for i in fresh if keys[i] not in self._recent]
+        known = self.store.known_ingest_keys(unknown) if unknown else {}
+        known.update({keys[i]: self._recent[keys[i]] for i in fresh if keys[i] in self._recent})
+        for i in fresh:
+            if keys[i] in known:
+                results[i] = {"status": "duplicate", "id": int(known[keys[i]])}
+        todo = [i for i in fresh if results[i] is None]
+
+        if todo:
+            chunk = pd.DataFrame([items[i] for i in todo], index=todo)
+            clean, _ = normalize_readings(chunk, self._known_schemes(), keep_index=True)
+            if not clean.empty:
+                for i, result in self._append(clean, [keys[i] for i in clean.index]).items():
+                    results[i] = result
+                    if isinstance(result, dict):
+                        self._remember(keys[i], result["id"])
+            for i in todo:
+                if results[i] is None:
+                    results[i] = {"status": "rejected"}
+
+        # in-batch repeats: a duplicate of their first copy's reading (or rejected with it)
+        for i, j in repeat_of.items():
+            head = results[j]
+            if isinstance(head, Exception):
+                results[i] = head
+            else:
+                results[i] = {"status": "duplicate", "id": head["id"]} if "id" in head else {"status": "rejected"}
+
+        counts = collections.Counter(r["status"] if isinstance(r, dict) else "failed" for r in results)
+        self.stats["accepted"] += counts["accepted"]
+        self.stats["duplicates"] += counts["duplicate"]
+        self.stats["rejected"] += counts["rejected"]
+        self.stats["failed"] += counts["failed"]
+        self.stats["batches"] += 1
+        self.stats["max_batch_rows"] = max(self.stats["max_batch_rows"], len(items))
+        self.stats["commit_seconds"] += time.perf_counter() - t0
+        return results
+
+    def _append(self, clean: pd.DataFrame, keys: list) -> dict:
+        """
+        Commit validated readings with freshly reserved ids and their idempotency keys in one append;
+        returns {row index: result or exception}. A failed append is retried as two halves (new ids), down to
+        single readings: one whose key was committed meanwhile by another writer is a duplicate, any other
+        failure is that reading's exception. Failing to reserve ids fails the whole batch.
+        """
+        _, first = self.store.reserve_ids(readings=len(clean))
+        ids = np.arange(first, first + len(clean), dtype=np.int64)
+        try:
+            self.store.append(readings=clean.assign(id=ids)[READING_COLUMNS],
+                              ingest_keys=pd.DataFrame({"key": keys, "reading_id": ids}))
+        except Exception as exc:
+            if len(clean) > 1:
+                self.stats["retries"] += 1
+                half = len(clean) // 2
+                return {**self._append(clean.iloc[:half], keys[:half]), **self._append(clean.iloc[half:], keys[half:])}
+            known = self.store.known_ingest_keys(keys)
+            return {clean.index[0]: {"status": "duplicate", "id": int(known[keys[0]])} if keys[0] in known else exc}
+        return {i: {"status": "accepted", "id": rid} for i, rid in zip(clean.index, ids.tolist())}
+
+    def _known_schemes(self) -> pd.DataFrame:
+        """Scheme ids / names for validation, reloaded when schemes were added (scheme ids only grow)."""
+        key = self.store.next_ids()[0]
+        if key != self._schemes_key:
+            self._schemes, self._schemes_key = self.store.schemes(columns=["id", "scheme_name", "so_name"]), key
+        return self._schemes
+
+    def _remember(self, key: str, reading_id: int):
+        self._recent[key] = reading_id
+        if len(self._recent) > RECENT_KEYS:
+            self._recent.popitem(last=False)
+
+
+# ---------- HTTP/1.1 front end (keep-alive, JSON bodies) ----------
+async def handle_connection(service: IngestService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            method, target = line.decode("latin-1").split(" ", 2)[:2]
+            headers = {}
+            while True:
+                h = await reader.readline()
+                if h in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = h.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length") or 0)
+            if length > MAX_BODY:
+                await _respond(writer, 413, {"error": f"body larger than {MAX_BODY} bytes"}, close=True)
+                break
+            body = await reader.readexactly(length) if length else b""
+            status, payload, extra = await _route(service, method, target.split("?", 1)[0], body)
+            close = headers.get("connection", "").lower() == "close"
+            await _respond(writer, status, payload, extra, close)
+            if close:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _route(service: IngestService, method: str, path: str, body: bytes) -> tuple:
+    if method == "GET" and path == "/health":
+        return 200, {"ok": True}, {}
+    if method == "GET" and path == "/stats":
+        return 200, service.snapshot(), {}
+    if method != "POST" or path != "/readings":
+        return 404, {"error": f"no route for {method} {path}"}, {}
+    try:
+        data = json.loads(body or b"null")
+    except ValueError:
+        return 400, {"error": "body is not valid JSON"}, {}
+    items = data.get("readings") if isinstance(data, dict) and "readings" in data else data
+    items = items if isinstance(items, list) else [items]
+    try:
+        return 200, {"results": await service.submit(items)}, {}
+    except Overloaded:
+        return 429, {"error": "ingest queue full, retry shortly"}, {"Retry-After": "1"}
+    except Exception as exc:
+        return 500, {"error": str(exc)}, {}
+
+
+async def _respond(writer: asyncio.StreamWriter, status: int, payload: dict, extra: dict = None, close: bool = False):
+    body = json.dumps(payload).encode("utf-8")
+    head = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}", "Content-Type: application/json",
+            f"Content-Length: {len(body)}", f"Connection: {'close' if close else 'keep-alive'}"]
+    head += [f"{k}: {v}" for k, v in (extra or {}).items()]
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+
+
+async def serve(store: ReadingsStore, host: str = "127.0.0.1", port: int = 8765, **options):
+    service = IngestService(store, **options)
+    await service.start()
+    server = await asyncio.start_server(lambda r, w: handle_connection(service, r, w), host, port, backlog=1024)
+    print(f"JJM ingest service on http://{host}:{port} (batch {service.max_batch}, "
+          f"delay {service.max_delay * 1e3:.0f} ms, max pending {service.max_pending})")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched asyncio ingest service for jalmitra BFM readings.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db", default=None, help="SQLAlchemy URL (default: JJM_DB_URL or local SQLite)")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--max-delay", type=float, default=MAX_DELAY, help="seconds")
+    parser.add_argument("--max-pending", type=int, default=MAX_PENDING)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(ReadingsStore(args.db, cache_readings=False), args.host, args.port,
+                          max_batch=args.max_batch, max_delay=args.max_delay, max_pending=args.max_pending))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,633 @@
+# jjm_store.py
+# Shared SQL-backed store for schemes, readings and per-SO jalmitra assignments.
+# SQLite is the local default; point JJM_DB_URL at a PostgreSQL URL to share a server database.
+
+import datetime
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql, sqlite
+
+from jjm_blocks import ReadingBlocks
+from jjm_today import TodayTracker
+
+DEFAULT_DB_URL = "sqlite:///jjm_dashboard.db"
+SUPPORTED_DIALECTS = ("sqlite", "postgresql")    # the rollup upsert uses their INSERT ... ON CONFLICT
+
+SCHEME_COLUMNS = ["id", "scheme_name", "functionality", "so_name", "ideal_per_day", "scheme_label"]
+READING_COLUMNS = ["id", "scheme_id", "jalmitra", "reading", "reading_date", "reading_time",
+                   "water_quantity", "scheme_name", "so_name"]
+ASSIGNMENT_COLUMNS = ["so_name", "scheme_id", "jalmitra", "scheme_label"]
+HIERARCHY_COLUMNS = ["so_name", "aee_name", "ee_name"]
+ROLLUP_KEYS = ["so_name", "reading_date", "jalmitra", "scheme_id"]
+ROLLUP_COLUMNS = ROLLUP_KEYS + ["water_quantity", "n_readings"]
+
+metadata = sa.MetaData()
+
+schemes_table = sa.Table(
+    "schemes", metadata,
+    sa.Column("id", sa.Integer, primary_key=True, autoincrement=False),
+    sa.Column("scheme_name", sa.String),
+    sa.Column("functionality", sa.String),
+    sa.Column("so_name", sa.String, index=True),
+    sa.Column("ideal_per_day", sa.Float),
+    sa.Column("scheme_label", sa.String),
+)
+
+readings_table = sa.Table(
+    "readings", metadata,
+    sa.Column("id", sa.Integer, primary_key=True, autoincrement=False),
+    sa.Column("scheme_id", sa.Integer),
+    sa.Column("jalmitra", sa.String),
+    sa.Column("reading", sa.Integer),
+    sa.Column("reading_date", sa.String(10)),   # ISO date, compares correctly as text
+    sa.Column("reading_time", sa.String),
+    sa.Column("water_quantity", sa.Float),
+    sa.Column("scheme_name", sa.String),
+    sa.Column("so_name", sa.String),
+    sa.Index("ix_readings_so_date", "so_name", "reading_date"),
+    sa.Index("ix_readings_scheme", "scheme_id"),
+    sa.Index("ix_readings_date", "reading_date"),
+)
+
+# one row per (so_name, reading_date, jalmitra, scheme_id): summed water (readings rounded to 2 dp,
+# as compute_metrics does) and the reading count; maintained on every append
+rollup_table = sa.Table(
+    "daily_rollup", metadata,
+    sa.Column("so_name", sa.String, primary_key=True),
+    sa.Column("reading_date", sa.String(10), primary_key=True),
+    sa.Column("jalmitra", sa.String, primary_key=True),
+    sa.Column("scheme_id", sa.Integer, primary_key=True),
+    sa.Column("water_quantity", sa.Float, nullable=False),
+    sa.Column("n_readings", sa.Integer, nullable=False),
+    sa.Index("ix_rollup_date", "reading_date"),
+)
+
+# one row per (SO, scheme) -> jalmitra assignment; rebuilds the per-SO mapping dicts
+assignments_table = sa.Table(
+    "jalmitra_assignments", metadata,
+    sa.Column("row_id", sa.Integer, primary_key=True, autoincrement=True),
+    sa.Column("so_name", sa.String, index=True),
+    sa.Column("scheme_id", sa.Integer),
+    sa.Column("jalmitra", sa.String),
+    sa.Column("scheme_label", sa.String),
+)
+
+# SO -> AEE -> EE reporting line (one row per SO; re-assigning an SO replaces its row)
+hierarchy_table = sa.Table(
+    "so_hierarchy", metadata,
+    sa.Column("so_name", sa.String, primary_key=True),
+    sa.Column("aee_name", sa.String, index=True),
+    sa.Column("ee_name", sa.String),
+)
+
+# idempotency keys of readings accepted by the ingest service (written in the same transaction as the rows)
+ingest_keys_table = sa.Table(
+    "ingest_keys", metadata,
+    sa.Column("key", sa.String, primary_key=True),
+    sa.Column("reading_id", sa.Integer),
+)
+INGEST_KEY_COLUMNS = ["key", "reading_id"]
+
+# counters: data_version (bumped on every write, so callers can cache by data version), clear_epoch
+# (bumped by every clear(), so copies of the readings can tell a refill from new rows) and the id
+# sequences scheme_id_seq / reading_id_seq (the last id handed out by reserve_ids)
+meta_table = sa.Table(
+    "store_meta", metadata,
+    sa.Column("key", sa.String, primary_key=True),
+    sa.Column("value", sa.Integer),
+)
+
+
+# ---------- compact in-memory schema ----------
+# Readings held in memory use small fixed-width dtypes; the tables keep plain text / numbers.
+# pandas has no day-resolution datetime, so dates are datetime64[s] (same 8 bytes as [D]).
+READING_DTYPES = {
+    "id": "int32",
+    "scheme_id": "int32",
+    "jalmitra": "category",
+    "reading": "int64",               # meter values come from the field unchecked; int32 would wrap
+    "reading_date": "datetime64[s]",
+    "reading_time": "int16",          # minutes since midnight, -1 = unknown
+    "water_quantity": "float32",
+    "scheme_name": "category",
+    "so_name": "category",
+}
+ROLLUP_DTYPES = {c: READING_DTYPES.get(c, "int32") for c in ROLLUP_COLUMNS}
+# readings denormalized with their scheme's attributes (joined once, when rows enter the block mirror)
+ENRICHED_COLUMNS = READING_COLUMNS + ["functionality", "ideal_per_day", "scheme_label"]
+ENRICHED_DTYPES = {**READING_DTYPES, "functionality": "category", "ideal_per_day": "float32",
+                   "scheme_label": "category"}
+
+
+def time_to_minutes(values) -> np.ndarray:
+    """'6:15 AM' / '18:15' / '18:15:00' -> minutes since midnight (int16, -1 if unparseable); parses each distinct value once."""
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object).fillna(""))
+    text = pd.Index(uniques).astype(str).str.strip().str.upper()
+    parsed = pd.to_datetime(text, format="%I:%M %p", errors="coerce")
+    parsed = parsed.where(parsed.notna(), pd.to_datetime(text, format="mixed", errors="coerce"))
+    minutes = np.where(parsed.isna(), -1, parsed.hour * 60 + parsed.minute).astype(np.int16)
+    return np.append(minutes, np.int16(-1))[codes]
+
+
+_TIME_LABELS = np.array([""] + [f"{(m // 60) % 12 or 12}:{m % 60:02d} {'AM' if m < 720 else 'PM'}" for m in range(1440)],
+                        dtype=object)
+
+
+def minutes_to_time(minutes) -> np.ndarray:
+    """Inverse of time_to_minutes in the generators' '6:15 AM' format ('' for -1)."""
+    return _TIME_LABELS[np.asarray(minutes, dtype=np.int64) + 1]
+
+
+def compact_frame(df: pd.DataFrame, dtypes: dict) -> pd.DataFrame:
+    """Copy of `df` with the columns in `dtypes` cast to the compact schema (other columns untouched)."""
+    out = df.copy(deep=False)
+    for c, dtype in dtypes.items():
+        if c not in out.columns or str(out[c].dtype) == dtype:
+            continue
+        if c == "reading_time":
+            out[c] = time_to_minutes(out[c])
+        elif c == "reading_date":
+            codes, uniques = pd.factorize(out[c])
+            days = pd.to_datetime(pd.Index(uniques), errors="coerce").astype(dtype)
+            out[c] = days.take(codes, allow_fill=True)
+        elif dtype == "category":
+            out[c] = out[c].astype("category")
+        elif dtype.startswith("int"):
+            out[c] = pd.to_numeric(out[c], errors="coerce").fillna(0).astype(dtype)
+        else:
+            out[c] = pd.to_numeric(out[c], errors="coerce").astype(dtype)
+    return out
+
+
+def compact_readings(df: pd.DataFrame) -> pd.DataFrame:
+    """Readings (or rollup rows) in the compact in-memory schema."""
+    return compact_frame(df, READING_DTYPES if "id" in df.columns else ROLLUP_DTYPES)
+
+
+def expand_readings(df: pd.DataFrame) -> pd.DataFrame:
+    """Compact readings back to the storage form: ISO date text, '6:15 AM' times, float64 water (to the litre)."""
+    out = df.copy(deep=False)
+    if "reading_date" in out.columns and pd.api.types.is_datetime64_any_dtype(out["reading_date"]):
+        codes, uniques = pd.factorize(out["reading_date"])
+        out["reading_date"] = np.append(pd.Index(uniques).strftime("%Y-%m-%d").to_numpy(dtype=object), None)[codes]
+    if "reading_time" in out.columns and pd.api.types.is_integer_dtype(out["reading_time"]):
+        out["reading_time"] = minutes_to_time(out["reading_time"].to_numpy())
+    if "water_quantity" in out.columns and out["water_quantity"].dtype == np.float32:
+        out["water_quantity"] = out["water_quantity"].astype(np.float64).round(3)
+    for c in out.columns:
+        if isinstance(out[c].dtype, pd.CategoricalDtype):
+            out[c] = out[c].astype(object)
+    return out
+
+
+def enrich_readings(readings: pd.DataFrame, schemes: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compact readings plus functionality / ideal_per_day / scheme_label of their scheme, looked up by
+    scheme-id position (no merge). so_name and scheme_name fall back to the scheme's when blank, the
+    reconciliation the SO page used to redo after every merge. Unknown schemes get blanks / 0.
+    """
+    s = schemes.drop_duplicates(subset=["id"])
+    pos = pd.Index(s["id"]).get_indexer(readings["scheme_id"])
+    known = pos >= 0
+    out = readings.copy(deep=False)
+
+    def _scheme_value(col, fill):
+        values = s[col].to_numpy(dtype=object)
+        return np.where(known, values[np.where(known, pos, 0)] if len(s) else fill, fill)
+
+    for col in ("so_name", "scheme_name"):
+        own = out[col].astype(object).to_numpy()
+        blank = pd.isna(own) | (own == "")
+        out[col] = np.where(blank, _scheme_value(col, ""), own)
+    out["functionality"] = _scheme_value("functionality", "")
+    out["ideal_per_day"] = pd.to_numeric(pd.Series(_scheme_value("ideal_per_day", 0.0)), errors="coerce").fillna(0.0).to_numpy()
+    out["scheme_label"] = _scheme_value("scheme_label", "")
+    return compact_frame(out, ENRICHED_DTYPES)[ENRICHED_COLUMNS]
+
+
+def bytes_per_reading(df: pd.DataFrame) -> float:
+    """Deep memory of `df` (object strings included) divided by its row count."""
+    return float(df.memory_usage(index=False, deep=True).sum()) / max(len(df), 1)
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> dict:
+    """{"rows", "bytes_per_reading_before", "bytes_per_reading_after", "ratio"} for a frame before/after compaction."""
+    b, a = bytes_per_reading(before), bytes_per_reading(after)
+    return {"rows": len(after), "bytes_per_reading_before": round(b, 1),
+            "bytes_per_reading_after": round(a, 1), "ratio": round(b / a, 2) if a else 0.0}
+
+
+def _sqlite_pragmas(dbapi_conn, _record):
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")      # readers don't block the writer
+    cur.execute("PRAGMA synchronous=NORMAL")
+    cur.close()
+
+
+class ReadingsStore:
+    """
+    Thin wrapper around a SQLAlchemy engine.
+    All sessions share one store; reads return only the rows/columns asked for.
+    With `cache_readings` the readings table is mirrored in an append-only ReadingBlocks container,
+    enriched with scheme attributes as rows arrive: each data-version change fetches only rows past the
+    last cached id, and readings() / enriched() filter in memory. The same new rows feed a TodayTracker,
+    so today_rows() / present_today() never touch older history. The first meter_deltas() call builds a
+    MeterTracker from the blocks; from then on it only checks new rows against each scheme's latest reading.
+    """
+
+    def __init__(self, url: str = None, cache_readings: bool = True):
+        self.url = url or os.environ.get("JJM_DB_URL", DEFAULT_DB_URL)
+        backend = sa.engine.make_url(self.url).get_backend_name()
+        if backend not in SUPPORTED_DIALECTS:
+            raise ValueError(f"Unsupported database for the JJM store: {backend} "
+                             f"(supported: {', '.join(SUPPORTED_DIALECTS)})")
+        self.blocks = ReadingBlocks() if cache_readings else None
+        self.today_tracker = TodayTracker() if cache_readings else None
+        self.meter_tracker = None               # built on first use by meter_deltas()
+        self._blocks_version = self._blocks_epoch = None
+        self._blocks_lock = threading.Lock()
+        self.engine = sa.create_engine(self.url)
+        if self.engine.dialect.name == "sqlite":
+            sa.event.listen(self.engine, "connect", _sqlite_pragmas)
+        metadata.create_all(self.engine)
+        with self.engine.begin() as conn:
+            self._init_meta(conn)
+            # stores created before the rollup existed: build it once from the readings
+            if (conn.execute(sa.select(rollup_table.c.so_name).limit(1)).first() is None
+                    and conn.execute(sa.select(readings_table.c.id).limit(1)).first() is not None):
+                self._rebuild_rollup(conn)
+
+    def _init_meta(self, conn):
+        """Create the store_meta counters that are missing; the id sequences start past the existing rows."""
+        counters = {"data_version": lambda: 0, "clear_epoch": lambda: 0,
+                    "scheme_id_seq": lambda: conn.execute(sa.select(sa.func.max(schemes_table.c.id))).scalar() or 0,
+                    "reading_id_seq": lambda: conn.execute(sa.select(sa.func.max(readings_table.c.id))).scalar() or 0}
+        present = set(conn.execute(sa.select(meta_table.c.key)).scalars())
+        for key, initial in counters.items():
+            if key not in present:
+                conn.execute(meta_table.insert().values(key=key, value=initial()))
+
+    # ---------- writes ----------
+    def reserve_ids(self, schemes: int = 0, readings: int = 0) -> tuple:
+        """
+        Reserve `schemes` scheme ids and `readings` reading ids; returns (first_scheme_id, first_reading_id).
+        Both sequences are advanced in one write transaction, which holds their store_meta rows (on SQLite the
+        database write lock) until it commits, so concurrent sessions and processes get disjoint ranges.
+        Ids are never handed out twice, not even after clear(); a reservation that is not appended leaves a gap.
+        """
+        first = []
+        with self.engine.begin() as conn:
+            for key, n in (("scheme_id_seq", schemes), ("reading_id_seq", readings)):
+                conn.execute(meta_table.update().where(meta_table.c.key == key)
+                             .values(value=meta_table.c.value + int(n)))
+                last = conn.execute(sa.select(meta_table.c.value).where(meta_table.c.key == key)).scalar_one()
+                first.append(int(last) - int(n) + 1)
+        return tuple(first)
+
+    def _bump_version(self, conn, key: str = "data_version"):
+        conn.execute(meta_table.update().where(meta_table.c.key == key).values(value=meta_table.c.value + 1))
+
+    def append(self, schemes: pd.DataFrame = None, readings: pd.DataFrame = None,
+               assignments: pd.DataFrame = None, hierarchy: pd.DataFrame = None, ingest_keys: pd.DataFrame = None):
+        """
+        Append new rows in one transaction and bump the data version. Readings are written as given;
+        compact ones are expanded first, so callers holding the storage form should pass that.
+        `ingest_keys` (key, reading_id) records idempotency keys atomically with the readings.
+        """
+        with self.engine.begin() as conn:
+            if schemes is not None and not schemes.empty:
+                self._insert_frame(conn, schemes_table, schemes[SCHEME_COLUMNS])
+            if readings is not None and not readings.empty:
+                readings = expand_readings(readings[READING_COLUMNS])
+                self._insert_frame(conn, readings_table, readings)
+                self._upsert_rollup(conn, readings)
+            if ingest_keys is not None and not ingest_keys.empty:
+                self._insert_frame(conn, ingest_keys_table, ingest_keys[INGEST_KEY_COLUMNS])
+            if assignments is not None and not assignments.empty:
+                self._insert_frame(conn, assignments_table, assignments[ASSIGNMENT_COLUMNS])
+            if hierarchy is not None and not hierarchy.empty:
+                so_names = hierarchy["so_name"].unique().tolist()
+                conn.execute(hierarchy_table.delete().where(hierarchy_table.c.so_name.in_(so_names)))
+                hierarchy[HIERARCHY_COLUMNS].drop_duplicates("so_name", keep="last").to_sql(
+                    "so_hierarchy", conn, if_exists="append", index=False)
+            self._bump_version(conn)
+
+    def _insert_frame(self, conn, table: sa.Table, frame: pd.DataFrame):
+        """
+        Bulk insert `frame` (columns already in table order). On SQLite the rows go straight to the
+        driver's executemany as plain tuples, which is about twice as fast as to_sql for large batches.
+        """
+        if self.engine.dialect.name != "sqlite":
+            frame.to_sql(table.name, conn, if_exists="append", index=False, chunksize=10_000)
+            return
+        cols = ", ".join(frame.columns)
+        marks = ", ".join("?" * len(frame.columns))
+        conn.exec_driver_sql(f"INSERT INTO {table.name} ({cols}) VALUES ({marks})",
+                             list(frame.itertuples(index=False, name=None)))
+
+    def clear(self):
+        """
+        Delete all data (schemes, readings, rollup, assignments, hierarchy, ingest keys) for every session
+        and bump the clear epoch.
+        """
+        with self.engine.begin() as conn:
+            for table in (readings_table, rollup_table, schemes_table, assignments_table, hierarchy_table,
+                          ingest_keys_table):
+                conn.execute(table.delete())
+            self._bump_version(conn)
+            self._bump_version(conn, "clear_epoch")
+        if self.blocks is not None:
+            self.blocks.clear()
+            self.today_tracker.reset(None)
+            self.meter_tracker = None
+
+    # ---------- daily rollup ----------
+    def _upsert_rollup(self, conn, readings: pd.DataFrame):
+        """Fold a batch of new readings into daily_rollup (only the touched keys are written)."""
+        batch = readings[ROLLUP_KEYS].copy()
+        batch["water_quantity"] = pd.to_numeric(readings["water_quantity"], errors="coerce").fillna(0.0).round(2)
+        batch = batch.dropna(subset=ROLLUP_KEYS)
+        if batch.empty:
+            return
+        batch = batch.groupby(ROLLUP_KEYS, sort=False, observed=True).agg(
+            water_quantity=("water_quantity", "sum"),
+            n_readings=("water_quantity", "size"),
+        ).reset_index()
+        insert = postgresql.insert if self.engine.dialect.name == "postgresql" else sqlite.insert
+        stmt = insert(rollup_table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=ROLLUP_KEYS,
+            set_={
+                "water_quantity": rollup_table.c.water_quantity + stmt.excluded.water_quantity,
+                "n_readings": rollup_table.c.n_readings + stmt.excluded.n_readings,
+            },
+        )
+        conn.execute(stmt, batch[ROLLUP_COLUMNS].to_dict("records"))
+
+    def _rebuild_rollup(self, conn):
+        t = readings_table
+        keys = [t.c[c] for c in ROLLUP_KEYS]
+        sel = (sa.select(*keys,
+                         sa.func.sum(sa.func.round(sa.func.coalesce(t.c.water_quantity, 0.0), 2)),
+                         sa.func.count())
+               .where(*[k.is_not(None) for k in keys])
+               .group_by(*keys))
+        conn.execute(rollup_table.delete())
+        conn.execute(rollup_table.insert().from_select(ROLLUP_COLUMNS, sel))
+
+    def rebuild_rollup(self):
+        """Recompute daily_rollup from the raw readings (repair / migration)."""
+        with self.engine.begin() as conn:
+            self._rebuild_rollup(conn)
+
+    # ---------- reads ----------
+    def version(self) -> int:
+        with self.engine.connect() as conn:
+            return int(conn.execute(sa.select(meta_table.c.value)
+                                    .where(meta_table.c.key == "data_version")).scalar_one())
+
+    def clear_epoch(self) -> int:
+        """Number of clear() calls on this database (by any process); a change means every row may be new."""
+        with self.engine.connect() as conn:
+            return int(conn.execute(sa.select(meta_table.c.value)
+                                    .where(meta_table.c.key == "clear_epoch")).scalar_one())
+
+    def next_ids(self):
+        """Return (next_scheme_id, next_reading_id) past the stored rows; a peek only, allocate with reserve_ids."""
+        with self.engine.connect() as conn:
+            max_sid = conn.execute(sa.select(sa.func.max(schemes_table.c.id))).scalar()
+            max_rid = conn.execute(sa.select(sa.func.max(readings_table.c.id))).scalar()
+        return (max_sid or 0) + 1, (max_rid or 0) + 1
+
+    def reading_count(self, upto_id: int = None) -> int:
+        """Number of readings (with id <= `upto_id` when given)."""
+        q = sa.select(sa.func.count()).select_from(readings_table)
+        if upto_id is not None:
+            q = q.where(readings_table.c.id <= upto_id)
+        with self.engine.connect() as conn:
+            return int(conn.execute(q).scalar())
+
+    def known_ingest_keys(self, keys: list) -> dict:
+        """{key: reading_id} for the idempotency keys in `keys` that were already ingested."""
+        t, found = ingest_keys_table, {}
+        keys = list(dict.fromkeys(keys))
+        with self.engine.connect() as conn:
+            for lo in range(0, len(keys), 500):          # stay under SQLite's bound-parameter limit
+                q = sa.select(t.c.key, t.c.reading_id).where(t.c.key.in_(keys[lo:lo + 500]))
+                found.update(conn.execute(q).all())
+        return found
+
+    def has_data(self) -> bool:
+        with self.engine.connect() as conn:
+            return conn.execute(sa.select(schemes_table.c.id).limit(1)).first() is not None
+
+    def schemes(self, so: str = None, columns: list = None) -> pd.DataFrame:
+        t = schemes_table
+        q = sa.select(*[t.c[c] for c in (columns or SCHEME_COLUMNS)])
+        if so is not None:
+            q = q.where(t.c.so_name == so)
+        with self.engine.connect() as conn:
+            return pd.read_sql(q.order_by(t.c.id), conn)
+
+    def readings(self, so: str = None, start: str = None, end: str = None, columns: list = None,
+                 compact: bool = False) -> pd.DataFrame:
+        """
+        Readings for an optional SO and inclusive ISO date window, in insertion (id) order.
+        `compact=True` returns them in the compact in-memory schema (READING_DTYPES).
+        """
+        if self.blocks is not None:
+            view = self._blocks_view(so, start, end, columns or READING_COLUMNS)
+            return view if compact else expand_readings(view)
+        t = readings_table
+        q = sa.select(*[t.c[c] for c in (columns or READING_COLUMNS)])
+        if so is not None:
+            q = q.where(t.c.so_name == so)
+        if start is not None:
+            q = q.where(t.c.reading_date >= start)
+        if end is not None:
+            q = q.where(t.c.reading_date <= end)
+        with self.engine.connect() as conn:
+            df = pd.read_sql(q.order_by(t.c.id), conn)
+        return compact_readings(df) if compact else df
+
+    def iter_readings(self, so: str = None, start: str = None, end: str = None, chunksize: int = 100_000,
+                      after_id: int = 0):
+        """
+        Readings in storage form (as readings() returns them), yielded `chunksize` rows at a time in id order,
+        optionally only those with id > `after_id`. Only one chunk is expanded to text at once; without the
+        mirror the rows stream from the database.
+        """
+        if self.blocks is not None:
+            view = self._blocks_view(so, start, end, READING_COLUMNS)
+            if after_id:
+                view = view.iloc[int(np.searchsorted(view["id"].to_numpy(), after_id, side="right")):]
+            for lo in range(0, len(view), chunksize):
+                yield expand_readings(view.iloc[lo:lo + chunksize])
+            return
+        t = readings_table
+        q = sa.select(*[t.c[c] for c in READING_COLUMNS]).where(t.c.id > after_id)
+        if so is not None:
+            q = q.where(t.c.so_name == so)
+        if start is not None:
+            q = q.where(t.c.reading_date >= start)
+        if end is not None:
+            q = q.where(t.c.reading_date <= end)
+        with self.engine.connect() as conn:
+            yield from pd.read_sql(q.order_by(t.c.id), conn, chunksize=chunksize)
+
+    def enriched(self, so: str = None, start: str = None, end: str = None, columns: list = None) -> pd.DataFrame:
+        """
+        Compact readings denormalized with their scheme's functionality / ideal_per_day / scheme_label
+        (ENRICHED_COLUMNS), for an optional SO and inclusive ISO window. so_name / scheme_name are already
+        reconciled with the scheme's, so callers filter directly; nothing is merged per call.
+        """
+        if self.blocks is not None:
+            return self._blocks_view(so, start, end, columns or ENRICHED_COLUMNS)
+        readings = self.readings(start=start, end=end, compact=True)
+        view = enrich_readings(readings, self.schemes())
+        if so is not None:
+            view = view[view["so_name"] == so].reset_index(drop=True)
+        return view[columns or ENRICHED_COLUMNS]
+
+    def _blocks_view(self, so, start, end, columns) -> pd.DataFrame:
+        self._sync_blocks()
+        view = self.blocks.view(so, start, end, columns)
+        if view is None:
+            view = compact_frame(pd.DataFrame(columns=columns), ENRICHED_DTYPES)
+        return view
+
+    def _sync_blocks(self):
+        """
+        Bring the in-memory readings blocks up to the current data version (tail fetch only).
+        A changed clear epoch means the table was cleared (possibly by another process or store) and
+        refilled, so the blocks and trackers are rebuilt from scratch, whatever the row ids are now.
+        """
+        version = self.version()
+        if version == self._blocks_version:
+            return
+        with self._blocks_lock:
+            if version == self._blocks_version:
+                return
+            t = readings_table
+            epoch = self.clear_epoch()
+            with self.engine.connect() as conn:
+                max_id = conn.execute(sa.select(sa.func.max(t.c.id))).scalar() or 0
+                if epoch != self._blocks_epoch or max_id < self.blocks.last_id:
+                    self.blocks.clear()
+                    self.today_tracker.reset(None)
+                    self.meter_tracker = None
+                    self._blocks_epoch = epoch
+                if max_id > self.blocks.last_id:
+                    q = (sa.select(*[t.c[c] for c in READING_COLUMNS])
+                         .where(t.c.id > self.blocks.last_id).order_by(t.c.id))
+                    # scheme attributes are joined here, once per new row, not on every read
+                    schemes = pd.read_sql(sa.select(*[schemes_table.c[c] for c in SCHEME_COLUMNS]), conn)
+                    block = enrich_readings(compact_readings(pd.read_sql(q, conn)), schemes)
+                    self.blocks.append(block)
+                    self.today_tracker.observe(block)
+                    if self.meter_tracker is not None:
+                        self.meter_tracker.observe(block)
+            self._blocks_version = version
+
+    # ---------- today ----------
+    def today_rows(self, so: str = None) -> pd.DataFrame:
+        """Today's enriched readings for an optional SO (ENRICHED_COLUMNS), without scanning history."""
+        if self.blocks is None:
+            day = datetime.date.today().isoformat()
+            return self.enriched(so=so, start=day, end=day)
+        rows = self._today().rows(so)
+        return rows if rows is not None else compact_frame(pd.DataFrame(columns=ENRICHED_COLUMNS), ENRICHED_DTYPES)
+
+    def present_today(self, so: str = None, functional: bool = False) -> set:
+        """Jalmitras with a reading today for an optional SO (`functional`: on Functional schemes only)."""
+        if self.blocks is None:
+            rows = self.today_rows(so)
+            if functional:
+                rows = rows[(rows["functionality"] == "Functional").to_numpy()]
+            return set(rows["jalmitra"].astype(str))
+        return self._today().present(so, functional)
+
+    def _today(self) -> TodayTracker:
+        """The tracker, synced to the current data version and reloaded from the blocks after midnight."""
+        self._sync_blocks()
+        tracker = self.today_tracker
+        if tracker.stale():
+            with self._blocks_lock:
+                if tracker.stale():
+                    day = tracker.current_day()
+                    tracker.reset(day, self.blocks.view(start=day, end=day, columns=ENRICHED_COLUMNS))
+        return tracker
+
+    # ---------- meter checks ----------
+    def meter_deltas(self, so: str = None, start: str = None, end: str = None) -> pd.DataFrame:
+        """
+        Cumulative-meter checks (jjm_meter.DELTA_COLUMNS) for an optional SO and inclusive ISO window.
+        With the mirror they are maintained as rows arrive; otherwise the SO's history up to `end` is checked.
+        """
+        if self.blocks is not None:
+            return self._meter().deltas(so, start, end)
+        from jjm_meter import meter_deltas
+        deltas = meter_deltas(self.enriched(so=so, end=end))[0]
+        if start is not None:
+            deltas = deltas[(deltas["reading_date"] >= np.datetime64(start, "s")).to_numpy()].reset_index(drop=True)
+        return deltas
+
+    def _meter(self):
+        """The MeterTracker, synced to the current data version; the first call checks the whole mirror."""
+        self._sync_blocks()
+        with self._blocks_lock:
+            if self.meter_tracker is None:
+                from jjm_meter import INPUT_COLUMNS, MeterTracker   # jjm_meter builds on this module's schema
+                tracker = MeterTracker()
+                tracker.observe(self.blocks.view(columns=INPUT_COLUMNS + ["so_name"]))
+                self.meter_tracker = tracker
+            return self.meter_tracker
+
+    def rollup(self, so: str = None, start: str = None, end: str = None, compact: bool = False) -> pd.DataFrame:
+        """
+        Daily rollup rows for an optional SO and inclusive ISO date window.
+        Same column names as readings (water_quantity is the day's sum), so it can stand in for
+        raw readings wherever only per-day totals / distinct days / distinct schemes are needed.
+        `compact=True` returns them in the compact in-memory schema (ROLLUP_DTYPES).
+        """
+        t = rollup_table
+        q = sa.select(*[t.c[c] for c in ROLLUP_COLUMNS])
+        if so is not None:
+            q = q.where(t.c.so_name == so)
+        if start is not None:
+            q = q.where(t.c.reading_date >= start)
+        if end is not None:
+            q = q.where(t.c.reading_date <= end)
+        with self.engine.connect() as conn:
+            df = pd.read_sql(q.order_by(t.c.so_name, t.c.reading_date, t.c.jalmitra, t.c.scheme_id), conn)
+        return compact_readings(df) if compact else df
+
+    def assignments(self) -> pd.DataFrame:
+        t = assignments_table
+        with self.engine.connect() as conn:
+            return pd.read_sql(sa.select(*[t.c[c] for c in ASSIGNMENT_COLUMNS]).order_by(t.c.row_id), conn)
+
+    def hierarchy(self) -> pd.DataFrame:
+        """SO -> AEE -> EE assignments (SOs without a row are left to the caller's defaults)."""
+        t = hierarchy_table
+        with self.engine.connect() as conn:
+            return pd.read_sql(sa.select(*[t.c[c] for c in HIERARCHY_COLUMNS]).order_by(t.c.so_name), conn)
+
+    def mappings(self):
+        """
+        Rebuild the per-SO mapping dicts used by the pages:
+          jalmitras_map        so_name -> list of jalmitras
+          scheme_jalmitra_map  so_name -> {scheme_id: jalmitra}
+          jalmitra_scheme_map  so_name -> {jalmitra: scheme_label}
+        """
+        jalmitras_map, scheme_jalmitra_map, jalmitra_scheme_map = {}, {}, {}
+        for so, sid, jm, label in self.assignments().itertuples(index=False, name=None):
+            jalmitras_map.setdefault(so, {})[jm] = None
+            scheme_jalmitra_map.setdefault(so, {})[int(sid)] = jm
+            jalmitra_scheme_map.setdefault(so, {})[jm] = label
+        jalmitras_map = {so: list(jms) for so, jms in jalmitras_map.items()}
+        return jalmitras_map, scheme_jalmitra_map, jalmitra_scheme_map
@@ -0,0 +1,89 @@
+# jjm_today.py
+# Incremental "today" view: per-SO present jalmitras and today's BFM rows, fed by each batch of new
+# readings as it reaches the store's block mirror. Reads cost O(rows today), independent of history.
+
+import datetime
+import threading
+
+import numpy as np
+import pandas as pd
+
+from jjm_blocks import _concat
+
+
+class TodayTracker:
+    """
+    Today's enriched readings (compact schema) grouped by SO, plus the jalmitras seen per SO.
+      observe(block)   keep the block's rows dated today; O(batch)
+      rows(so)         today's rows for one SO (all SOs when None), in arrival order
+      present(so)      set of jalmitras with a reading today (`functional=True`: on Functional schemes)
+    The tracker is bound to one day; `stale()` turns True after midnight and the owner reloads it
+    with `reset(day, rows)` from the day's slice of the readings.
+    """
+
+    def __init__(self, clock=datetime.date.today):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.reset(None)
+
+    def reset(self, day: str = None, rows: pd.DataFrame = None):
+        """Start tracking `day` (ISO; None = not loaded), optionally seeded with that day's rows."""
+        with self._lock:
+            self.day = day
+            self._parts = {}            # so_name -> [(frame, row positions or None)]
+            self._present = {}          # so_name -> set of jalmitras
+            self._functional = {}       # so_name -> set of jalmitras on Functional schemes
+        if day is not None and rows is not None:
+            self.observe(rows)
+
+    def current_day(self) -> str:
+        return self._clock().isoformat()
+
+    def stale(self) -> bool:
+        return self.day != self.current_day()
+
+    def observe(self, block: pd.DataFrame):
+        """Add the rows of `block` (enriched readings) that fall on the tracked day."""
+        if self.day is None or block is None or block.empty:
+            return
+        dates = block["reading_date"].to_numpy(dtype="datetime64[s]")
+        todays = block.loc[dates == np.datetime64(self.day, "s")]
+        if todays.empty:
+            return
+        functional = (todays["functionality"] == "Functional").to_numpy()
+        # jalmitra text once for the batch (a per-SO astype(str) would convert every category each time)
+        jm_codes, jm_names = pd.factorize(todays["jalmitra"])
+        jm_text = np.append(pd.Index(jm_names).astype(str).to_numpy(dtype=object), "")[jm_codes]
+        with self._lock:
+            for so, idx in todays.groupby("so_name", observed=True, sort=False).indices.items():
+                so = str(so)
+                self._parts.setdefault(so, []).append((todays, idx))     # sliced lazily by rows()
+                self._present.setdefault(so, set()).update(jm_text[idx])
+                self._functional.setdefault(so, set()).update(jm_text[idx[functional[idx]]])
+
+    def rows(self, so: str = None) -> pd.DataFrame:
+        """Today's rows for `so` (or every SO); None when there are none."""
+        with self._lock:
+            if so is not None:
+                parts = self._parts.get(so)
+                if not parts:
+                    return None
+                if len(parts) > 1 or parts[0][1] is not None:
+                    self._parts[so] = parts = [(_slices(parts), None)]
+                return parts[0][0]
+            parts = [p for ps in self._parts.values() for p in ps]
+        return _slices(parts) if parts else None
+
+    def present(self, so: str = None, functional: bool = False) -> set:
+        """Jalmitras with a reading today for `so` (union over SOs when None); a fresh set."""
+        sets = self._functional if functional else self._present
+        with self._lock:
+            if so is not None:
+                return set(sets.get(so, ()))
+            return set().union(*sets.values())
+
+
+def _slices(parts: list) -> pd.DataFrame:
+    """One frame from (frame, positions) pairs; positions None = the whole frame."""
+    frames = [f if idx is None else f.iloc[idx].reset_index(drop=True) for f, idx in parts]
+    return _concat(frames) if len(frames) > 1 else frames[0]
@@ -0,0 +1,26 @@
+# Tests import the jjm_* modules and the benchmarks from the repo root, as the app and scripts do.
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jjm_demo import BUILD_DAY, generate_district, place_dataset  # noqa: E402
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    """A fresh SQLite store file per test."""
+    return f"sqlite:///{tmp_path / 'jjm.db'}"
+
+
+@pytest.fixture(scope="session")
+def district_frames():
+    """A small seeded district (2 AEEs x 2 SOs x 4 schemes, 10 days) as built for the dataset cache."""
+    return generate_district(2, 2, 4, days=10, today=BUILD_DAY, seed=7)
+
+
+@pytest.fixture
+def district(district_frames):
+    """The district with ids from 1 and dates ending today."""
+    return place_dataset(district_frames, 1, 1)
@@ -0,0 +1,88 @@
+# ReadingsArchive sync: incremental appends, rebuilds after a store clear, and reads matching the store.
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+from jjm_archive import ReadingsArchive  # noqa: E402
+from jjm_store import ReadingsStore  # noqa: E402
+
+
+def append_district(store, frames):
+    store.append(schemes=frames["schemes"], readings=frames["readings"], assignments=frames["assignments"],
+                 hierarchy=frames["hierarchy"])
+
+
+@pytest.fixture
+def store(db_url):
+    return ReadingsStore(db_url, cache_readings=False)
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return ReadingsArchive(str(tmp_path / "archive"))
+
+
+def assert_matches(archive, store, **filters):
+    assert archive.readings(**filters)["id"].tolist() == store.readings(**filters)["id"].tolist()
+    pd.testing.assert_frame_equal(archive.rollup(**filters), store.rollup(**filters), check_dtype=False)
+
+
+def test_sync_writes_all_rows_once(archive, store, district):
+    append_district(store, district)
+    assert archive.sync(store) == len(district["readings"])
+    assert archive.sync(store) == 0                    # same data version
+    assert archive.manifest["rows"] == len(district["readings"])
+    assert_matches(archive, store)
+    so = district["schemes"]["so_name"].iloc[0]
+    assert_matches(archive, store, so=so)
+
+
+def test_sync_appends_only_new_rows(archive, store, district):
+    readings = district["readings"]
+    head = len(readings) // 2
+    append_district(store, {**district, "readings": readings.iloc[:head]})
+    archive.sync(store)
+    store.append(readings=readings.iloc[head:])
+    assert archive.sync(store) == len(readings) - head
+    assert_matches(archive, store)
+
+
+def test_manifest_is_reloaded_by_a_new_archive(archive, store, district):
+    append_district(store, district)
+    archive.sync(store)
+    reopened = ReadingsArchive(archive.root)
+    assert reopened.sync(store) == 0
+    assert_matches(reopened, store)
+
+
+def test_sync_rebuilds_after_the_store_is_cleared(archive, store, district, db_url):
+    append_district(store, district)
+    archive.sync(store)
+    # another process clears and refills with the same ids and more rows: the epoch gives it away
+    other = ReadingsStore(db_url, cache_readings=False)
+    other.clear()
+    append_district(other, {**district, "readings": district["readings"].assign(water_quantity=1.0)})
+    assert archive.sync(store) == len(district["readings"])
+    assert archive.manifest["epoch"] == store.clear_epoch()
+    assert (archive.readings()["water_quantity"] == 1.0).all()
+    assert_matches(archive, store)
+
+
+def test_sync_rebuilds_when_archived_rows_are_missing(archive, store, district):
+    append_district(store, district)
+    archive.sync(store)
+    with store.engine.begin() as conn:
+        conn.exec_driver_sql("DELETE FROM readings WHERE id <= 3")
+    store.append(readings=district["readings"].iloc[:0])   # bump the data version
+    assert archive.sync(store) == len(district["readings"]) - 3
+    assert archive.readings()["id"].tolist() == store.readings()["id"].tolist()    # the rollup was not edited
+
+
+def test_clear_empties_the_archive_until_the_next_sync(archive, store, district):
+    append_district(store, district)
+    archive.sync(store)
+    archive.clear()
+    assert archive.readings().empty
+    assert archive.sync(store) == len(district["readings"])
+    assert_matches(archive, store)
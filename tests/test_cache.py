@@ -0,0 +1,129 @@
+# MetricsCache: entries keyed by the store's data version, LRU / TTL eviction and single computation.
+
+import threading
+import time
+
+from jjm_cache import MetricsCache
+from jjm_store import ReadingsStore
+
+
+def counting(value):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return value
+    return compute, calls
+
+
+def test_hit_after_miss():
+    cache = MetricsCache()
+    compute, calls = counting("m")
+    assert cache.get_or_compute((1, "metrics", "SO"), compute) == "m"
+    assert cache.get_or_compute((1, "metrics", "SO"), compute) == "m"
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_newer_version_drops_older_entries():
+    cache = MetricsCache()
+    cache.get_or_compute((1, "a"), lambda: "a1")
+    cache.get_or_compute((1, "b"), lambda: "b1")
+    assert cache.get_or_compute((2, "a"), lambda: "a2") == "a2"
+    assert cache.stats()["entries"] == 1 and cache.stats()["version"] == 2
+
+
+def test_result_of_an_older_version_is_not_stored():
+    cache = MetricsCache()
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "old"
+    t = threading.Thread(target=cache.get_or_compute, args=((1, "a"), slow))
+    t.start()
+    started.wait(5)
+    cache.get_or_compute((2, "a"), lambda: "new")       # data changed while version 1 was computing
+    release.set()
+    t.join()
+    assert cache.get_or_compute((1, "a"), lambda: "again") == "again"
+    assert cache.stats()["entries"] == 1
+
+
+def test_concurrent_misses_compute_once():
+    cache = MetricsCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return "m"
+    threads = [threading.Thread(target=cache.get_or_compute, args=((1, "a"), compute)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+
+
+def test_callers_of_one_key_share_its_lock():
+    # with a zero TTL every waiter recomputes; the computations must still never overlap
+    cache = MetricsCache(ttl_seconds=0.0)
+    running, overlaps = [], []
+    guard = threading.Lock()
+
+    def compute():
+        with guard:
+            running.append(1)
+            overlaps.append(len(running))
+        time.sleep(0.01)
+        with guard:
+            running.pop()
+        return "m"
+
+    def worker():
+        for _ in range(5):
+            cache.get_or_compute((1, "a"), compute)
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert max(overlaps) == 1
+    assert not cache._key_locks
+
+
+def test_lru_and_ttl_eviction():
+    cache = MetricsCache(max_entries=2, ttl_seconds=3600)
+    for name in ("a", "b"):
+        cache.get_or_compute((1, name), lambda: name)
+    cache.get_or_compute((1, "a"), lambda: "x")          # a is now the most recent
+    cache.get_or_compute((1, "c"), lambda: "c")
+    compute, calls = counting("b again")
+    assert cache.get_or_compute((1, "b"), compute) == "b again" and calls
+
+    expiring = MetricsCache(ttl_seconds=0.0)
+    expiring.get_or_compute((1, "a"), lambda: "a")
+    time.sleep(0.01)
+    assert expiring.get_or_compute((1, "a"), lambda: "fresh") == "fresh"
+
+
+def test_invalidate():
+    cache = MetricsCache()
+    cache.get_or_compute((1, "a"), lambda: "a")
+    cache.invalidate()
+    assert cache.stats()["entries"] == 0
+
+
+def test_store_writes_move_the_key_to_a_new_version(db_url, district):
+    store, cache = ReadingsStore(db_url, cache_readings=False), MetricsCache()
+
+    def count():
+        return cache.get_or_compute((store.version(), "count"), store.reading_count)
+    assert count() == 0
+    store.append(schemes=district["schemes"], readings=district["readings"])
+    assert count() == len(district["readings"])
+    store.clear()
+    assert count() == 0
+    assert cache.stats()["entries"] == 1
@@ -0,0 +1,52 @@
+# Parity of jjm_engine.compute_metrics with the merge-based version it replaced, on messy readings.
+
+import numpy as np
+import pytest
+
+from benchmarks.bench_compute_metrics import (as_categorical, assert_same_metrics, legacy_compute_metrics,
+                                              synthetic, window)
+from jjm_engine import compute_metrics
+
+WINDOWS = (7, 15, 30)     # the dashboards' 7 / 15 / 30-day windows
+
+
+@pytest.fixture(scope="module")
+def messy():
+    return synthetic(num_sos=4, n=20_000, schemes_per_so=12)
+
+
+@pytest.mark.parametrize("period", WINDOWS)
+@pytest.mark.parametrize("so", ["SO 0", "SO 3", "no such SO"])
+def test_matches_legacy_on_messy_readings(messy, period, so):
+    readings, schemes = messy
+    start, end = window(period)
+    old_rows, old = legacy_compute_metrics(readings, schemes, so, start, end)
+    new_rows, new = compute_metrics(readings, schemes, so, start, end)
+    assert_same_metrics(old, new)
+    assert sorted(new_rows["id"]) == sorted(old_rows["id_reading"])
+    assert (new_rows["so_name"] == so).all()
+
+
+@pytest.mark.parametrize("period", WINDOWS)
+def test_matches_legacy_without_scheme_name_column(messy, period):
+    readings, schemes = messy
+    readings = readings.drop(columns=["scheme_name"])
+    start, end = window(period)
+    assert_same_metrics(legacy_compute_metrics(readings, schemes, "SO 1", start, end)[1],
+                        compute_metrics(readings, schemes, "SO 1", start, end)[1])
+
+
+@pytest.mark.parametrize("period", WINDOWS)
+def test_categorical_readings_match_legacy(messy, period):
+    readings, schemes = messy
+    start, end = window(period)
+    assert_same_metrics(legacy_compute_metrics(readings, schemes, "SO 2", start, end)[1],
+                        compute_metrics(as_categorical(readings), schemes, "SO 2", start, end)[1])
+
+
+def test_messy_data_is_messy(messy):
+    readings, schemes = messy
+    assert (readings["so_name"] == "").any() and readings["so_name"].isna().any()
+    assert readings["scheme_name"].isna().any()
+    assert not readings["scheme_id"].isin(schemes["id"]).all()
+    assert np.isnan(readings["water_quantity"]).any()
@@ -0,0 +1,27 @@
+# ingest_file: readings reach the database exactly as the file has them, whatever the compact
+# in-memory schema holds.
+
+import datetime
+
+import pandas as pd
+
+from jjm_ingest import ingest_file
+from jjm_store import ReadingsStore
+
+
+def test_file_values_are_stored_unrounded(db_url, district, tmp_path):
+    store = ReadingsStore(db_url)
+    store.append(schemes=district["schemes"], assignments=district["assignments"])
+    sid, jm = store.assignments()[["scheme_id", "jalmitra"]].iloc[0]
+    today = datetime.date.today().isoformat()
+    path = tmp_path / "readings.csv"
+    pd.DataFrame({"scheme_id": sid, "jalmitra": jm, "reading": [2_999_999_999, 123_456, 7],
+                  "reading_date": today, "reading_time": "7:15 AM",
+                  "water_quantity": ["12.3456", "123456.7", "0.125"]}).to_csv(path, index=False)
+
+    report = ingest_file(store, str(path))
+    assert report["rows"] == 3 and report["rejected"] == 0
+    stored = ReadingsStore(db_url, cache_readings=False).readings()
+    assert stored["reading"].tolist() == [2_999_999_999, 123_456, 7]
+    assert stored["water_quantity"].tolist() == [12.3456, 123456.7, 0.125]
+    assert store.readings(compact=True)["reading"].tolist() == [2_999_999_999, 123_456, 7]
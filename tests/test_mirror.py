@@ -0,0 +1,75 @@
+# The in-memory ReadingBlocks mirror of a store: tail sync, clears by other stores, and today's rows.
+
+import datetime
+
+from jjm_demo import place_dataset
+from jjm_store import ReadingsStore
+
+
+def append_district(store, frames):
+    store.append(schemes=frames["schemes"], readings=frames["readings"], assignments=frames["assignments"],
+                 hierarchy=frames["hierarchy"])
+
+
+def db_ids(url, **filters):
+    return ReadingsStore(url, cache_readings=False).readings(**filters)["id"].tolist()
+
+
+def test_mirror_matches_the_database(db_url, district):
+    mirror = ReadingsStore(db_url)
+    append_district(mirror, district)
+    assert mirror.readings()["id"].tolist() == db_ids(db_url)
+    so = district["schemes"]["so_name"].iloc[0]
+    today = datetime.date.today()
+    start = (today - datetime.timedelta(days=3)).isoformat()
+    assert mirror.readings(so=so, start=start)["id"].tolist() == db_ids(db_url, so=so, start=start)
+
+
+def test_mirror_fetches_only_the_tail_written_by_another_store(db_url, district):
+    mirror, writer = ReadingsStore(db_url), ReadingsStore(db_url, cache_readings=False)
+    head = len(district["readings"]) - 5
+    append_district(writer, {**district, "readings": district["readings"].iloc[:head]})
+    assert len(mirror.readings()) == head
+    blocks = len(mirror.blocks._blocks)
+    writer.append(readings=district["readings"].iloc[head:])
+    assert mirror.readings()["id"].tolist() == db_ids(db_url)
+    assert len(mirror.blocks._blocks) == blocks + 1           # a small tail block, earlier rows untouched
+    assert mirror.blocks.last_id == district["readings"]["id"].max()
+
+
+def test_mirror_rebuilds_after_another_store_clears_and_refills(db_url, district):
+    mirror, other = ReadingsStore(db_url), ReadingsStore(db_url, cache_readings=False)
+    append_district(other, district)
+    assert len(mirror.readings()) == len(district["readings"])
+    other.clear()
+    # refilled with more rows and the same ids: only the clear epoch tells the mirror its rows are gone
+    bigger = {**district, "readings": district["readings"].assign(water_quantity=1.0)}
+    append_district(other, bigger)
+    got = mirror.readings()
+    assert got["id"].tolist() == db_ids(db_url)
+    assert (got["water_quantity"] == 1.0).all()
+
+
+def test_mirror_clear_empties_it(db_url, district):
+    mirror = ReadingsStore(db_url)
+    append_district(mirror, district)
+    mirror.clear()
+    assert mirror.readings().empty
+    assert mirror.today_rows().empty
+
+
+def test_today_rows_follow_the_mirror(db_url, district):
+    mirror = ReadingsStore(db_url)
+    append_district(mirror, district)
+    today = datetime.date.today().isoformat()
+    assert sorted(mirror.today_rows()["id"]) == db_ids(db_url, start=today, end=today)
+
+
+def test_placed_dataset_ids_follow_the_reservation(db_url, district_frames):
+    store = ReadingsStore(db_url)
+    for _ in range(2):
+        frames = place_dataset(district_frames, *store.reserve_ids(len(district_frames["schemes"]),
+                                                                   len(district_frames["readings"])))
+        append_district(store, frames)
+    ids = store.readings()["id"]
+    assert ids.is_unique and len(ids) == 2 * len(district_frames["readings"])
@@ -0,0 +1,99 @@
+# IngestService idempotency: retried submissions are answered "duplicate" with the original reading id,
+# in the same micro-batch, in later batches, and after a restart; a store clear forgets the keys.
+
+import asyncio
+import datetime
+
+import pytest
+
+from jjm_service import IngestService, idempotency_key
+from jjm_store import ReadingsStore
+
+
+@pytest.fixture
+def store(db_url, district):
+    store = ReadingsStore(db_url, cache_readings=False)
+    store.append(schemes=district["schemes"], assignments=district["assignments"])
+    return store
+
+
+def submission(store, n, key=None, **extra):
+    sid, jm = store.assignments()[["scheme_id", "jalmitra"]].iloc[n % 5]
+    item = {"scheme_id": int(sid), "jalmitra": jm, "reading": 100_000 + n,
+            "reading_date": datetime.date.today().isoformat(), "reading_time": "7:15 AM",
+            "water_quantity": 40.0 + n, **extra}
+    if key is not None:
+        item["idempotency_key"] = key
+    return item
+
+
+def run(store, *requests, service=None):
+    """Submit each request (a list of items) in turn to one service; returns the results per request."""
+    async def main():
+        svc = service or IngestService(store, max_delay=0.01)
+        await svc.start()
+        try:
+            return [await svc.submit(items) for items in requests], svc
+        finally:
+            await svc.stop()
+    return asyncio.run(main())
+
+
+def test_retried_submission_is_a_duplicate_of_the_first(store):
+    items = [submission(store, i, key=f"k{i}") for i in range(3)]
+    (first, again), svc = run(store, items, items)
+    assert [r["status"] for r in first] == ["accepted"] * 3
+    assert again == [{"status": "duplicate", "id": r["id"]} for r in first]
+    assert store.reading_count() == 3
+    assert svc.snapshot()["accepted"] == 3 and svc.snapshot()["duplicates"] == 3
+
+
+def test_repeats_within_one_request_share_the_first_copy(store):
+    item = submission(store, 0, key="same")
+    (results,), _ = run(store, [item, dict(item), submission(store, 1, key="other")])
+    assert results[0]["status"] == "accepted"
+    assert results[1] == {"status": "duplicate", "id": results[0]["id"]}
+    assert results[2]["status"] == "accepted"
+    assert store.reading_count() == 2
+
+
+def test_keys_survive_a_restart(store):
+    items = [submission(store, i, key=f"k{i}") for i in range(2)]
+    (first,), _ = run(store, items)
+    (again,), _ = run(store, items)                    # a new service: keys come from the store
+    assert again == [{"status": "duplicate", "id": r["id"]} for r in first]
+
+
+def test_content_key_without_a_client_key(store):
+    item = submission(store, 0)
+    assert idempotency_key(item) == "|".join(str(item[c]) for c in
+                                             ("jalmitra", "scheme_id", "reading_date", "reading_time", "reading"))
+    (first, again), _ = run(store, [item], [dict(item)])
+    assert first[0]["status"] == "accepted" and again[0] == {"status": "duplicate", "id": first[0]["id"]}
+    (other,), _ = run(store, [submission(store, 0, reading=999_999)])
+    assert other[0]["status"] == "accepted"
+
+
+def test_invalid_items_are_rejected_without_a_key(store):
+    (results,), _ = run(store, [submission(store, 0, key="bad", scheme_id=10**9), "not a reading"])
+    assert [r["status"] for r in results] == ["rejected", "rejected"]
+    assert store.known_ingest_keys(["bad"]) == {}
+
+
+def test_clear_forgets_the_keys(store, district):
+    item = submission(store, 0, key="k")
+    service = IngestService(store, max_delay=0.01)
+    (first,), _ = run(store, [item], service=service)
+    store.clear()
+    store.append(schemes=district["schemes"], assignments=district["assignments"])
+    (again,), _ = run(store, [item], service=service)  # same service: its recent keys must go too
+    assert again[0]["status"] == "accepted" and again[0]["id"] != first[0]["id"]
+
+
+def test_accepted_ids_are_unique_across_writers(store):
+    (results,), _ = run(store, [submission(store, i, key=f"k{i}") for i in range(20)])
+    store.reserve_ids(readings=7)                      # another writer reserving in between
+    (more,), _ = run(store, [submission(store, i, key=f"m{i}") for i in range(20)])
+    ids = [r["id"] for r in results + more]
+    assert len(set(ids)) == 40
+    assert sorted(store.readings()["id"]) == sorted(ids)
@@ -0,0 +1,109 @@
+# ReadingsStore writes: append, clear, id reservation and the daily rollup upsert.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from jjm_demo import place_dataset
+from jjm_store import ROLLUP_KEYS, ReadingsStore
+
+
+def append_district(store, frames):
+    store.append(schemes=frames["schemes"], readings=frames["readings"], assignments=frames["assignments"],
+                 hierarchy=frames["hierarchy"])
+
+
+def expected_rollup(readings: pd.DataFrame) -> pd.DataFrame:
+    r = readings.assign(water_quantity=readings["water_quantity"].astype(float).round(2))
+    return (r.groupby(ROLLUP_KEYS, observed=True).agg(water_quantity=("water_quantity", "sum"),
+                                                        n_readings=("water_quantity", "size"))
+            .reset_index())
+
+
+def test_append_stores_rows_and_bumps_version(db_url, district):
+    store = ReadingsStore(db_url, cache_readings=False)
+    v0 = store.version()
+    append_district(store, district)
+    assert store.version() == v0 + 1
+    assert store.has_data()
+    assert store.reading_count() == len(district["readings"])
+    assert store.readings()["id"].tolist() == district["readings"]["id"].tolist()
+    assert len(store.schemes()) == len(district["schemes"])
+    assert store.mappings()[0].keys() == set(district["assignments"]["so_name"])
+
+
+def test_clear_empties_every_table_and_bumps_the_epoch(db_url, district):
+    store = ReadingsStore(db_url, cache_readings=False)
+    append_district(store, district)
+    version, epoch = store.version(), store.clear_epoch()
+    store.clear()
+    assert store.version() == version + 1
+    assert store.clear_epoch() == epoch + 1
+    assert not store.has_data()
+    assert store.reading_count() == 0
+    assert store.rollup().empty and store.assignments().empty and store.hierarchy().empty
+
+
+def test_reserve_ids_hands_out_disjoint_ranges(db_url):
+    a, b = ReadingsStore(db_url, cache_readings=False), ReadingsStore(db_url, cache_readings=False)
+    assert a.reserve_ids(schemes=3, readings=10) == (1, 1)
+    assert b.reserve_ids(schemes=2, readings=5) == (4, 11)
+    assert a.reserve_ids(readings=1) == (6, 16)      # nothing reserved: the next scheme id, unchanged
+    assert a.reserve_ids(schemes=1) == (6, 17)
+
+
+def test_reserved_ids_are_not_reused_after_clear(db_url, district):
+    store = ReadingsStore(db_url, cache_readings=False)
+    sid, rid = store.reserve_ids(len(district["schemes"]), len(district["readings"]))
+    append_district(store, place_dataset(district, sid, rid))
+    store.clear()
+    assert store.reserve_ids(1, 1) == (sid + len(district["schemes"]), rid + len(district["readings"]))
+
+
+def test_sequences_of_an_older_database_start_past_its_rows(db_url, district):
+    store = ReadingsStore(db_url, cache_readings=False)
+    append_district(store, district)
+    # a database written before the id sequences existed has rows but no counters
+    with store.engine.begin() as conn:
+        conn.exec_driver_sql("DELETE FROM store_meta WHERE key IN ('scheme_id_seq', 'reading_id_seq')")
+    reopened = ReadingsStore(db_url, cache_readings=False)
+    assert reopened.reserve_ids(1, 1) == (len(district["schemes"]) + 1, len(district["readings"]) + 1)
+
+
+def test_next_ids_is_a_peek(db_url, district):
+    store = ReadingsStore(db_url, cache_readings=False)
+    assert store.next_ids() == (1, 1)
+    append_district(store, district)
+    peek = store.next_ids()
+    assert store.next_ids() == peek == (district["schemes"]["id"].max() + 1, district["readings"]["id"].max() + 1)
+
+
+def test_rollup_upsert_accumulates_repeated_keys(db_url, district):
+    store = ReadingsStore(db_url, cache_readings=False)
+    append_district(store, district)
+    readings = district["readings"]
+    again = readings.iloc[: len(readings) // 3].assign(id=readings["id"].iloc[: len(readings) // 3] + len(readings))
+    store.append(readings=again)
+
+    got = store.rollup()
+    want = expected_rollup(store.readings())
+    assert len(got) == len(want)
+    merged = got.merge(want, on=ROLLUP_KEYS, suffixes=("", "_want"))
+    assert len(merged) == len(want)
+    assert (merged["n_readings"] == merged["n_readings_want"]).all()
+    np.testing.assert_allclose(merged["water_quantity"], merged["water_quantity_want"], rtol=1e-9)
+    assert merged["n_readings"].max() >= 2
+
+
+def test_rebuild_rollup_matches_the_upserts(db_url, district):
+    store = ReadingsStore(db_url, cache_readings=False)
+    append_district(store, district)
+    upserted = store.rollup()
+    store.rebuild_rollup()
+    pd.testing.assert_frame_equal(store.rollup(), upserted)
+
+
+@pytest.mark.parametrize("url", ["mysql://user@localhost/jjm", "oracle://user@localhost/jjm"])
+def test_unsupported_databases_are_rejected(url):
+    with pytest.raises(ValueError, match="Unsupported database"):
+        ReadingsStore(url)